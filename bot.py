@@ -3,31 +3,52 @@ Clod - AI Twitter Reply Bot
 Monitors mentions and replies using Claude AI
 """
 
-import json
+import asyncio
 import logging
 import os
+import random
+import re
 import signal
 import sys
 import time
-from dataclasses import dataclass, field
+from collections import OrderedDict
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 from types import FrameType
-from typing import Any, Callable, Optional, TypeVar
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, TypeVar
 
+import aiohttp
 import anthropic
+import numpy as np
+import orjson
 import tweepy
 from dotenv import load_dotenv
+from tweepy.asynchronous import AsyncClient, AsyncStreamingClient
 
 from config import (
+    BLOCKED_PATTERNS,
     CHECK_MENTIONS_INTERVAL,
+    CLAUDE_MAX_TOKENS,
     CLOD_SYSTEM_PROMPT,
+    GREETING_REPLIES,
+    HANDLED_MENTIONS_SIZE,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    MAX_CONCURRENT_GENERATIONS,
+    MAX_RATE_LIMIT_WAIT,
     MAX_RESPONSE_LENGTH,
     MAX_RETRIES,
+    MAX_RETRY_DELAY,
     RATE_LIMIT_DELAY,
     REPLY_DELAY,
     RETRY_DELAY,
+    SEMANTIC_CACHE_FILE,
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CACHE_THRESHOLD,
     STATE_FILE,
+    TEXT_CACHE_SIZE,
+    USER_CACHE_SIZE,
 )
 
 # Configure logging
@@ -43,81 +64,199 @@ load_dotenv()
 # Type variable for generic return types
 T = TypeVar('T')
 
+# Sleep used between retries; rebind bot._sleep in tests instead of
+# patching asyncio.sleep for the whole interpreter
+_sleep = asyncio.sleep
+
+# Jitter source for retry waits, rebindable the same way
+_random = random.random
+
+# Errors that retry_on_error treats as retryable API failures
+API_ERRORS: tuple[type[Exception], ...] = (tweepy.TweepyException, anthropic.APIError)
+
+# Mention pre-filters, compiled once
+_LEADING_MENTIONS = re.compile(r'^(\s*@\w+)+')
+# Matched per whitespace-separated token; a single pattern over the whole
+# body backtracks exponentially on chains like "http://http://..."
+_URL = re.compile(r'https?://\S+')
+_BLOCK = re.compile('|'.join(BLOCKED_PATTERNS), re.IGNORECASE) if BLOCKED_PATTERNS else None
+_GREETING = re.compile(r'^(hi+|hey+|hello|yo+|gm|sup)[\s!.?]*$', re.IGNORECASE)
+# Stands in for the author's handle in semantically cached replies
+_AUTHOR_SLOT = "@{author}"
+
+# System prompt marked cacheable. Anthropic only caches prefixes of at least
+# 1024 tokens on Sonnet, so this is a no-op until the prompt grows past that
+CACHED_SYSTEM_PROMPT: list[dict[str, Any]] = [{
+    "type": "text",
+    "text": CLOD_SYSTEM_PROMPT,
+    "cache_control": {"type": "ephemeral"},
+}]
+
+
+class ApiKeys(NamedTuple):
+    """Snapshot of the API credentials read from the environment."""
+
+    twitter_api_key: Optional[str]
+    twitter_api_secret: Optional[str]
+    twitter_access_token: Optional[str]
+    twitter_access_secret: Optional[str]
+    anthropic_api_key: Optional[str]
+    twitter_bearer_token: Optional[str] = None  # Optional, enables streaming
+
+    @classmethod
+    def from_env(cls) -> 'ApiKeys':
+        """Read every key from the environment in a single pass."""
+        return cls(*(os.environ.get(name.upper()) for name in cls._fields))
+
 
-@dataclass
 class BotMetrics:
     """Tracks bot performance metrics."""
 
-    mentions_processed: int = 0
-    replies_sent: int = 0
-    errors_count: int = 0
-    rate_limits_hit: int = 0
-    retries_count: int = 0
-    start_time: datetime = field(default_factory=datetime.now)
-    last_activity: Optional[datetime] = None
-    consecutive_failures: int = 0
+    __slots__ = (
+        "mentions_processed",
+        "replies_sent",
+        "errors_count",
+        "rate_limits_hit",
+        "retries_count",
+        "mentions_skipped",
+        "semantic_cache_hits",
+        "cache_read_tokens",
+        "cache_creation_tokens",
+        "start_time",
+        "last_activity",
+        "consecutive_failures",
+        "_health",
+    )
+
+    def __init__(self) -> None:
+        self.mentions_processed: int = 0
+        self.replies_sent: int = 0
+        self.errors_count: int = 0
+        self.rate_limits_hit: int = 0
+        self.retries_count: int = 0
+        self.mentions_skipped: int = 0
+        self.semantic_cache_hits: int = 0
+        self.cache_read_tokens: int = 0
+        self.cache_creation_tokens: int = 0
+        self.start_time: float = time.monotonic()
+        self.last_activity: Optional[float] = None  # time.monotonic() of last event
+        self.consecutive_failures: int = 0
+
+        # Allocated once and updated in place by get_health_status()
+        self._health: dict[str, Any] = {
+            "healthy": True,
+            "uptime_seconds": 0.0,
+            "mentions_processed": 0,
+            "replies_sent": 0,
+            "errors_count": 0,
+            "rate_limits_hit": 0,
+            "retries_count": 0,
+            "mentions_skipped": 0,
+            "semantic_cache_hits": 0,
+            "cache_read_tokens": 0,
+            "cache_creation_tokens": 0,
+            "consecutive_failures": 0,
+            "last_activity": None,
+        }
 
     def record_success(self) -> None:
         """Record a successful operation."""
-        self.last_activity = datetime.now()
+        self.last_activity = time.monotonic()
         self.consecutive_failures = 0
 
     def record_failure(self) -> None:
         """Record a failed operation."""
         self.errors_count += 1
         self.consecutive_failures += 1
-        self.last_activity = datetime.now()
+        self.last_activity = time.monotonic()
 
     def record_rate_limit(self) -> None:
         """Record a rate limit hit."""
         self.rate_limits_hit += 1
-        self.last_activity = datetime.now()
+        self.last_activity = time.monotonic()
 
     def record_retry(self) -> None:
         """Record a retry attempt."""
         self.retries_count += 1
 
+    def record_cache_usage(self, usage: Any) -> None:
+        """Record prompt cache token usage from a Claude response."""
+        self.cache_read_tokens += int(
+            getattr(usage, "cache_read_input_tokens", 0) or 0
+        )
+        self.cache_creation_tokens += int(
+            getattr(usage, "cache_creation_input_tokens", 0) or 0
+        )
+
     def get_uptime_seconds(self) -> float:
         """Get bot uptime in seconds."""
-        return (datetime.now() - self.start_time).total_seconds()
+        return time.monotonic() - self.start_time
+
+    def get_last_activity_iso(self) -> Optional[str]:
+        """Get the last activity time as an ISO 8601 wall-clock string."""
+        if self.last_activity is None:
+            return None
+        elapsed = time.monotonic() - self.last_activity
+        return datetime.fromtimestamp(time.time() - elapsed).isoformat()
 
     def get_health_status(self) -> dict[str, Any]:
-        """Get current health status."""
-        return {
-            "healthy": self.consecutive_failures < 5,
-            "uptime_seconds": self.get_uptime_seconds(),
-            "mentions_processed": self.mentions_processed,
-            "replies_sent": self.replies_sent,
-            "errors_count": self.errors_count,
-            "rate_limits_hit": self.rate_limits_hit,
-            "retries_count": self.retries_count,
-            "consecutive_failures": self.consecutive_failures,
-            "last_activity": self.last_activity.isoformat() if self.last_activity else None,
-        }
+        """
+        Get current health status.
+
+        Returns:
+            Health status dictionary, reused between calls; copy it
+            before modifying or keeping a snapshot
+        """
+        health = self._health
+        health["healthy"] = self.consecutive_failures < 5
+        health["uptime_seconds"] = self.get_uptime_seconds()
+        health["mentions_processed"] = self.mentions_processed
+        health["replies_sent"] = self.replies_sent
+        health["errors_count"] = self.errors_count
+        health["rate_limits_hit"] = self.rate_limits_hit
+        health["retries_count"] = self.retries_count
+        health["mentions_skipped"] = self.mentions_skipped
+        health["semantic_cache_hits"] = self.semantic_cache_hits
+        health["cache_read_tokens"] = self.cache_read_tokens
+        health["cache_creation_tokens"] = self.cache_creation_tokens
+        health["consecutive_failures"] = self.consecutive_failures
+        health["last_activity"] = self.get_last_activity_iso()
+        return health
 
 
 class CircuitBreaker:
     """Circuit breaker pattern for API calls."""
 
+    __slots__ = (
+        "failure_threshold",
+        "recovery_timeout",
+        "failures",
+        "last_failure_time",
+        "state",
+        "clock",
+    )
+
     def __init__(
         self,
         failure_threshold: int = 5,
-        recovery_timeout: int = 60
+        recovery_timeout: int = 60,
+        clock: Callable[[], float] = time.monotonic
     ) -> None:
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.clock = clock  # Swappable so tests can advance time instantly
         self.failures: int = 0
-        self.last_failure_time: Optional[float] = None
+        self.last_failure_time: Optional[float] = None  # clock() of last failure
         self.state: str = "closed"  # closed, open, half-open
 
     def record_failure(self) -> None:
         """Record a failure and potentially open the circuit."""
         self.failures += 1
-        self.last_failure_time = time.time()
+        self.last_failure_time = self.clock()
 
         if self.failures >= self.failure_threshold:
             self.state = "open"
-            logger.warning(f"Circuit breaker opened after {self.failures} failures")
+            logger.warning("Circuit breaker opened after %d failures", self.failures)
 
     def record_success(self) -> None:
         """Record a success and reset the circuit."""
@@ -133,7 +272,7 @@ class CircuitBreaker:
             if self.last_failure_time is None:
                 return True
 
-            elapsed = time.time() - self.last_failure_time
+            elapsed = self.clock() - self.last_failure_time
             if elapsed >= self.recovery_timeout:
                 self.state = "half-open"
                 logger.info("Circuit breaker half-open, allowing test request")
@@ -144,51 +283,343 @@ class CircuitBreaker:
         return True
 
 
+class SemanticCache:
+    """Reuses Claude replies for tweets similar to ones already answered."""
+
+    def __init__(
+        self,
+        embed: Callable[[str], Any],
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_size: int = SEMANTIC_CACHE_SIZE,
+        model: str = SEMANTIC_CACHE_MODEL
+    ) -> None:
+        self.embed = embed
+        self.threshold = threshold
+        self.max_size = max_size
+        self.model = model  # Saved with the cache; files from other models are ignored
+        self.embeddings: Optional[np.ndarray] = None  # (n, dim) float32, L2-normalized
+        self.responses: list[str] = []
+        self.recipients: list[set[str]] = []
+        self.last_used: list[int] = []
+        self._clock: int = 0
+        self._dirty: bool = False  # Entries changed since the last save or load
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    @staticmethod
+    def _normalize(embedding: Any) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _touch(self, index: int) -> None:
+        """Mark an entry as most recently used."""
+        self._clock += 1
+        self.last_used[index] = self._clock
+
+    def lookup(self, embedding: Any, author: str) -> Optional[str]:
+        """
+        Find a cached reply for a similar tweet.
+
+        Args:
+            embedding: Embedding of the incoming tweet
+            author: Username of the tweet author
+
+        Returns:
+            Cached reply, or None on miss or if the author already got it
+        """
+        if self.embeddings is None or not self.responses:
+            return None
+
+        vector = self._normalize(embedding)
+        if vector.shape[0] != self.embeddings.shape[1]:
+            logger.warning("Semantic cache embedding width changed, ignoring cache")
+            return None
+
+        sims = self.embeddings @ vector
+        index = int(np.argmax(sims))
+        if sims[index] <= self.threshold:
+            return None
+
+        # Don't send the same canned reply to the same user twice
+        if author in self.recipients[index]:
+            return None
+
+        self._touch(index)
+        self.recipients[index].add(author)
+        return self.responses[index]
+
+    def add(self, embedding: Any, response: str, author: str) -> None:
+        """
+        Store a reply, evicting the least recently used entry when full.
+
+        Args:
+            embedding: Embedding of the tweet that was answered
+            response: Reply that was generated
+            author: Username the reply was sent to
+        """
+        row = self._normalize(embedding)[np.newaxis, :]
+        if self.embeddings is not None and row.shape[1] != self.embeddings.shape[1]:
+            # Entries from a different embedding model can never match again
+            self.clear()
+
+        if len(self) >= self.max_size:
+            self._evict()
+
+        if self.embeddings is None or not self.responses:
+            self.embeddings = row
+        else:
+            self.embeddings = np.vstack([self.embeddings, row])
+
+        self.responses.append(response)
+        self.recipients.append({author})
+        self.last_used.append(0)
+        self._touch(len(self) - 1)
+        self._dirty = True
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        self.embeddings = None
+        self.responses = []
+        self.recipients = []
+        self.last_used = []
+        self._dirty = True
+
+    def _evict(self) -> None:
+        """Drop the least recently used entry."""
+        index = int(np.argmin(self.last_used))
+        if self.embeddings is not None:
+            self.embeddings = np.delete(self.embeddings, index, axis=0)
+        del self.responses[index]
+        del self.recipients[index]
+        del self.last_used[index]
+
+    def save(self, path: str) -> bool:
+        """
+        Save cached embeddings and replies to file if they changed.
+
+        Returns:
+            True if save was successful, False otherwise
+        """
+        if not self._dirty or self.embeddings is None or not self.responses:
+            return True
+
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    embeddings=self.embeddings,
+                    responses=np.array(self.responses),
+                    model=np.array(self.model)
+                )
+            # Atomic rename so a crash mid-write never corrupts the cache file
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("Could not save semantic cache: %s", e)
+            return False
+
+        self._dirty = False
+        return True
+
+    def load(self, path: str) -> None:
+        """Load cached embeddings and replies from file, starting empty on any failure."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                embeddings = data["embeddings"].astype(np.float32)
+                responses = [str(r) for r in data["responses"]]
+                model = str(data["model"])
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            # Truncated or garbled files raise BadZipFile, EOFError, ...;
+            # the cache is optional, so never let it stop startup
+            logger.warning("Could not load semantic cache: %s", e)
+            return
+
+        if model != self.model:
+            logger.info("Semantic cache was built with %s, starting fresh", model)
+            return
+
+        if len(embeddings) != len(responses):
+            logger.warning("Semantic cache file is inconsistent")
+            return
+
+        # Keep the most recently added entries if the size cap shrank
+        start = max(0, len(responses) - self.max_size)
+        self.embeddings = embeddings[start:]
+        self.responses = responses[start:]
+        self.recipients = [set() for _ in self.responses]
+        self.last_used = []
+        for _ in self.responses:
+            self._clock += 1
+            self.last_used.append(self._clock)
+
+
+def load_embedder() -> Optional[Callable[[str], Any]]:
+    """
+    Load the local embedding model used by the semantic cache.
+
+    Returns:
+        Function mapping text to an embedding, or None if
+        sentence-transformers is not installed or the model cannot be loaded
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.info("sentence-transformers not installed, semantic cache disabled")
+        return None
+
+    try:
+        model = SentenceTransformer(SEMANTIC_CACHE_MODEL)
+    except Exception as e:
+        # Usually a failed or offline model download
+        logger.warning(
+            "Could not load %s, semantic cache disabled: %s", SEMANTIC_CACHE_MODEL, e
+        )
+        return None
+
+    def embed(text: str) -> Any:
+        return model.encode(text, normalize_embeddings=True)
+
+    return embed
+
+
+class MentionStream(AsyncStreamingClient):
+    """Filtered stream that pushes new mentions onto a queue."""
+
+    def __init__(
+        self,
+        bearer_token: str,
+        queue: asyncio.Queue[Optional[Any]],
+        on_reconnect: Callable[[], Awaitable[None]],
+        on_users: Optional[Callable[[list[Any]], None]] = None
+    ) -> None:
+        super().__init__(bearer_token)
+        self.queue = queue
+        self.on_reconnect = on_reconnect
+        self.on_users = on_users
+
+    async def on_connect(self) -> None:
+        """Catch up on mentions missed while disconnected."""
+        logger.info("Connected to mention stream")
+        await self.on_reconnect()
+
+    async def on_tweet(self, tweet: tweepy.Tweet) -> None:
+        """Queue a mention for processing."""
+        await self.queue.put(tweet)
+
+    async def on_includes(self, includes: dict[str, Any]) -> None:
+        """Pass expanded authors on so their usernames can be cached."""
+        if self.on_users is not None:
+            self.on_users(includes.get("users", []))
+
+
+def rate_limit_wait(error: tweepy.TooManyRequests) -> float:
+    """
+    Work out how long to wait after a rate limit response.
+
+    Uses the Retry-After or x-rate-limit-reset header when present,
+    falling back to RATE_LIMIT_DELAY. Header-derived waits are capped at
+    MAX_RATE_LIMIT_WAIT so a far-off reset never stalls a batch for long.
+
+    Args:
+        error: Rate limit exception raised by tweepy
+
+    Returns:
+        Seconds to wait before retrying
+    """
+    headers = getattr(error.response, "headers", None) or {}
+
+    try:
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+        if retry_after is not None:
+            wait = float(retry_after)
+        else:
+            reset = headers.get("x-rate-limit-reset")
+            if reset is None:
+                return RATE_LIMIT_DELAY
+            wait = float(reset) - time.time()
+    except (TypeError, ValueError):
+        return RATE_LIMIT_DELAY
+
+    # Small jitter so concurrent callers don't all retry at the same instant
+    return min(MAX_RATE_LIMIT_WAIT, max(1.0, wait)) + _random()
+
+
 def retry_on_error(
     max_retries: int = MAX_RETRIES,
     delay: int = RETRY_DELAY,
     metrics: Optional[BotMetrics] = None,
-    circuit_breaker: Optional[CircuitBreaker] = None
-) -> Callable[[Callable[..., T]], Callable[..., Optional[T]]]:
-    """Decorator for retrying failed API calls with circuit breaker support."""
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    sleep: Optional[Callable[[float], Awaitable[Any]]] = None
+) -> Callable[
+    [Callable[..., Awaitable[T]]], Callable[..., Awaitable[Optional[T]]]
+]:
+    """
+    Decorator for retrying failed async API calls with circuit breaker support.
+
+    Args:
+        max_retries: Attempts before giving up
+        delay: Base seconds for exponential backoff
+        metrics: Metrics to record retries and rate limits on
+        circuit_breaker: Breaker consulted before and updated after calls
+        sleep: Waits between attempts; returning True (as
+            ClodBot.wait_or_stop does on shutdown) abandons the call.
+            Defaults to asyncio.sleep
+    """
 
-    def decorator(func: Callable[..., T]) -> Callable[..., Optional[T]]:
+    def decorator(
+        func: Callable[..., Awaitable[T]]
+    ) -> Callable[..., Awaitable[Optional[T]]]:
         @wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Optional[T]:
+        async def wrapper(*args: Any, **kwargs: Any) -> Optional[T]:
             if circuit_breaker and not circuit_breaker.can_execute():
-                logger.warning(f"Circuit breaker open, skipping {func.__name__}")
+                logger.warning("Circuit breaker open, skipping %s", func.__name__)
                 return None
 
-            last_exception: Optional[Exception] = None
-
             for attempt in range(max_retries):
                 try:
-                    result = func(*args, **kwargs)
+                    result = await func(*args, **kwargs)
                     if circuit_breaker:
                         circuit_breaker.record_success()
                     return result
 
                 except tweepy.TooManyRequests as e:
-                    logger.warning(f"Rate limited, waiting {RATE_LIMIT_DELAY}s...")
                     if metrics:
                         metrics.record_rate_limit()
-                        metrics.record_retry()
-                    time.sleep(RATE_LIMIT_DELAY)
-                    last_exception = e
 
-                except (tweepy.TweepyException, anthropic.APIError) as e:
-                    last_exception = e
+                    # The reset window can be minutes long; don't wait it
+                    # out only to give up afterwards
+                    if attempt == max_retries - 1:
+                        logger.error("Still rate limited after %d attempts", max_retries)
+                        break
+
+                    wait = rate_limit_wait(e)
+                    logger.warning("Rate limited, waiting %.1fs...", wait)
                     if metrics:
                         metrics.record_retry()
+                    if await (sleep or _sleep)(wait) is True:
+                        break
 
+                except API_ERRORS as e:
                     if attempt < max_retries - 1:
+                        if metrics:
+                            metrics.record_retry()
+
+                        # Exponential backoff with jitter to avoid retrying in lockstep
+                        wait = min(MAX_RETRY_DELAY, delay * 2 ** attempt)
+                        wait += _random() * delay
                         logger.warning(
-                            f"Attempt {attempt + 1} failed: {e}. "
-                            f"Retrying in {delay}s..."
+                            "Attempt %d failed: %s. Retrying in %.1fs...",
+                            attempt + 1, e, wait
                         )
-                        time.sleep(delay)
+                        if await (sleep or _sleep)(wait) is True:
+                            break
                     else:
-                        logger.error(f"All {max_retries} attempts failed: {e}")
+                        logger.error("All %d attempts failed: %s", max_retries, e)
                         if circuit_breaker:
                             circuit_breaker.record_failure()
 
@@ -197,6 +628,12 @@ def retry_on_error(
     return decorator
 
 
+def mention_body(text: Optional[str]) -> str:
+    """Strip the leading @mentions from a tweet, leaving what was said."""
+    return _LEADING_MENTIONS.sub('', text or '').strip()
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def truncate_smart(text: str, max_length: int = MAX_RESPONSE_LENGTH) -> str:
     """
     Truncate text to max_length without cutting words.
@@ -227,6 +664,7 @@ def truncate_smart(text: str, max_length: int = MAX_RESPONSE_LENGTH) -> str:
     return truncated.rstrip('.,!? ') + "..."
 
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def validate_tweet_text(text: str) -> tuple[bool, str]:
     """
     Validate tweet text before posting.
@@ -254,43 +692,70 @@ class ClodBot:
 
     def __init__(self) -> None:
         self.running: bool = True
-        self.twitter_client: Optional[tweepy.Client] = None
-        self.claude_client: Optional[anthropic.Anthropic] = None
+        self._stop = asyncio.Event()
+        self.twitter_client: Optional[AsyncClient] = None
+        self.claude_client: Optional[anthropic.AsyncAnthropic] = None
         self.my_user_id: Optional[str] = None
+        self.my_username: Optional[str] = None
+        self.keys: Optional[ApiKeys] = None
         self.state: dict[str, Any] = {}
         self.metrics: BotMetrics = BotMetrics()
         self.circuit_breaker: CircuitBreaker = CircuitBreaker()
+        self.semantic_cache: Optional[SemanticCache] = None
+        self.stream: Optional[MentionStream] = None
+        self.mention_queue: Optional[asyncio.Queue[Optional[Any]]] = None
+        self._user_cache: OrderedDict[str, str] = OrderedDict()
+        self._handled_ids: OrderedDict[str, None] = OrderedDict()
+        self._resume_id: Optional[int] = None  # last_mention_id when streaming began
+        self._state_dirty: bool = False
+        self._generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+        # Reusable Claude message payloads, one per in-flight generation
+        self._message_bufs: list[list[dict[str, str]]] = []
+
+        # Wrap API calls once here rather than rebuilding the retry
+        # wrapper on every call
+        api_retry = retry_on_error(
+            metrics=self.metrics,
+            circuit_breaker=self.circuit_breaker,
+            sleep=self.wait_or_stop
+        )
+        self._call_claude = api_retry(self._call_claude_impl)
+        self._get_user = api_retry(self._get_user_impl)
+        self._post = api_retry(self._post_impl)
+        self._fetch = api_retry(self._fetch_impl)
 
     def check_api_keys(self) -> None:
-        """Verify all required API keys are present."""
-        required_keys = [
-            'TWITTER_API_KEY',
-            'TWITTER_API_SECRET',
-            'TWITTER_ACCESS_TOKEN',
-            'TWITTER_ACCESS_SECRET',
-            'ANTHROPIC_API_KEY'
-        ]
+        """Verify all required API keys are present.
 
-        missing = [key for key in required_keys if not os.getenv(key)]
+        Takes the environment snapshot that initialize_clients and run
+        read from afterwards.
+        """
+        self.keys = ApiKeys.from_env()
+        missing = [
+            name.upper() for name, value in self.keys._asdict().items()
+            if not value and name not in ApiKeys._field_defaults
+        ]
 
         if missing:
-            logger.error(f"Missing API keys: {', '.join(missing)}")
+            logger.error("Missing API keys: %s", ', '.join(missing))
             logger.error("Please set them in .env file")
             sys.exit(1)
 
     def load_state(self) -> dict[str, Any]:
         """Load bot state from file."""
-        if os.path.exists(STATE_FILE):
-            try:
-                with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if not isinstance(data, dict):
-                        logger.warning("State file contains invalid data type")
-                        return {}
-                    return data
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Could not load state: {e}")
-        return {}
+        try:
+            with open(STATE_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (orjson.JSONDecodeError, IOError) as e:
+            logger.warning("Could not load state: %s", e)
+            return {}
+
+        if not isinstance(data, dict):
+            logger.warning("State file contains invalid data type")
+            return {}
+        return data
 
     def save_state(self) -> bool:
         """
@@ -299,48 +764,96 @@ class ClodBot:
         Returns:
             True if save was successful, False otherwise
         """
+        tmp_file = f"{STATE_FILE}.tmp"
         try:
-            with open(STATE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.state, f, indent=2)
-            return True
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(self.state))
+            # Atomic rename so a crash mid-write never corrupts the state file
+            os.replace(tmp_file, STATE_FILE)
         except IOError as e:
-            logger.error(f"Could not save state: {e}")
+            logger.error("Could not save state: %s", e)
             return False
 
+        self._state_dirty = False
+        if self.semantic_cache is not None:
+            return self.semantic_cache.save(SEMANTIC_CACHE_FILE)
+        return True
+
+    def flush_state(self) -> bool:
+        """
+        Save bot state only if it changed since the last save.
+
+        Returns:
+            True if state is on disk, False if the save failed
+        """
+        if not self._state_dirty:
+            return True
+        return self.save_state()
+
     def signal_handler(self, signum: int, frame: Optional[FrameType]) -> None:
         """Handle shutdown signals gracefully."""
         logger.info("Shutdown signal received, finishing up...")
         self.running = False
+        self._stop.set()
+        self.flush_state()
+        truncate_smart.cache_clear()
+        validate_tweet_text.cache_clear()
+
+        # Wake the stream consumer so it can exit
+        if self.mention_queue is not None:
+            self.mention_queue.put_nowait(None)
+
+    async def initialize_clients(self) -> None:
+        """Initialize async Twitter and Claude API clients."""
+        if self.keys is None:
+            self.keys = ApiKeys.from_env()
+        self.twitter_client = AsyncClient(
+            consumer_key=self.keys.twitter_api_key,
+            consumer_secret=self.keys.twitter_api_secret,
+            access_token=self.keys.twitter_access_token,
+            access_token_secret=self.keys.twitter_access_secret
+        )
 
-    def initialize_clients(self) -> None:
-        """Initialize Twitter and Claude API clients."""
-        self.twitter_client = tweepy.Client(
-            consumer_key=os.getenv('TWITTER_API_KEY'),
-            consumer_secret=os.getenv('TWITTER_API_SECRET'),
-            access_token=os.getenv('TWITTER_ACCESS_TOKEN'),
-            access_token_secret=os.getenv('TWITTER_ACCESS_SECRET')
+        # AsyncClient opens a new connection per request unless given a
+        # session, so keep one pooled keep-alive session for all Twitter calls
+        self.twitter_client.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_MAX_CONNECTIONS,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
         )
 
-        self.claude_client = anthropic.Anthropic(
-            api_key=os.getenv('ANTHROPIC_API_KEY')
+        # AsyncAnthropic already pools connections for the client's lifetime
+        self.claude_client = anthropic.AsyncAnthropic(
+            api_key=self.keys.anthropic_api_key
         )
 
-    def authenticate(self) -> None:
+    async def close_clients(self) -> None:
+        """Close pooled HTTP connections held by the API clients."""
+        if self.twitter_client is not None and self.twitter_client.session is not None:
+            await self.twitter_client.session.close()
+            self.twitter_client.session = None
+
+        if self.claude_client is not None:
+            await self.claude_client.close()
+
+    async def authenticate(self) -> None:
         """Authenticate with Twitter and get user info."""
         try:
             if self.twitter_client is None:
                 raise tweepy.TweepyException("Twitter client not initialized")
 
-            my_user = self.twitter_client.get_me()
+            my_user = await self.twitter_client.get_me()
             if not my_user or not my_user.data:
                 raise tweepy.TweepyException("Could not get user data")
             self.my_user_id = str(my_user.data.id)
-            logger.info(f"Logged in as @{my_user.data.username}")
+            self.my_username = my_user.data.username
+            logger.info("Logged in as @%s", my_user.data.username)
         except tweepy.TweepyException as e:
-            logger.error(f"Failed to authenticate with Twitter: {e}")
+            logger.error("Failed to authenticate with Twitter: %s", e)
             sys.exit(1)
 
-    def get_claude_response(
+    async def get_claude_response(
         self,
         tweet_text: str,
         author_username: str
@@ -363,46 +876,111 @@ class ClodBot:
             logger.warning("Empty tweet text received")
             return None
 
-        @retry_on_error(
-            metrics=self.metrics,
-            circuit_breaker=self.circuit_breaker
-        )
-        def _call_claude() -> str:
-            message = self.claude_client.messages.create(
+        embedding = None
+        if self.semantic_cache is not None:
+            # A broken cache should cost a Claude call, never the reply
+            try:
+                # Embedding is CPU-bound, keep it off the event loop
+                embedding = await asyncio.to_thread(self.semantic_cache.embed, tweet_text)
+                cached = self.semantic_cache.lookup(embedding, author_username)
+            except Exception as e:
+                logger.warning("Semantic cache lookup failed: %s", e)
+                embedding = cached = None
+            if cached:
+                logger.info("Semantic cache hit for @%s", author_username)
+                self.metrics.semantic_cache_hits += 1
+                return truncate_smart(cached.replace(_AUTHOR_SLOT, f"@{author_username}"))
+
+        response = await self._call_claude(tweet_text, author_username)
+        if not response:
+            return None
+
+        response = truncate_smart(response)
+        if self.semantic_cache is not None and embedding is not None:
+            try:
+                # Replies often address the author; store the handle as a
+                # slot so a reuse names whoever is being answered then
+                template = re.sub(
+                    rf"@{re.escape(author_username)}\b", _AUTHOR_SLOT,
+                    response, flags=re.IGNORECASE
+                )
+                self.semantic_cache.add(embedding, template, author_username)
+            except Exception as e:
+                logger.warning("Could not add reply to semantic cache: %s", e)
+        return response
+
+    async def _call_claude_impl(self, tweet_text: str, author_username: str) -> str:
+        """
+        Stream a reply from Claude (wrapped with retries in __init__).
+
+        Stops reading as soon as the text no longer fits in a tweet, since
+        truncate_smart() would discard the rest anyway.
+        """
+        # Generations run concurrently, so each call borrows its own buffer;
+        # the pool never grows past MAX_CONCURRENT_GENERATIONS
+        messages = self._message_bufs.pop() if self._message_bufs else [
+            {"role": "user", "content": ""}
+        ]
+        messages[0]["content"] = f"Tweet from @{author_username}: {tweet_text}"
+
+        text = ""
+        try:
+            async with self.claude_client.messages.stream(
                 model="claude-sonnet-4-20250514",
-                max_tokens=1000,
-                system=CLOD_SYSTEM_PROMPT,
-                messages=[{
-                    "role": "user",
-                    "content": f"Tweet from @{author_username}: {tweet_text}"
-                }]
-            )
-            return message.content[0].text
+                max_tokens=CLAUDE_MAX_TOKENS,
+                system=CACHED_SYSTEM_PROMPT,
+                messages=messages
+            ) as stream:
+                async for chunk in stream.text_stream:
+                    text += chunk
+                    if len(text) > MAX_RESPONSE_LENGTH:
+                        break
+
+                # Cache usage arrives with the first event, so it is known
+                # even if we stop early
+                self.metrics.record_cache_usage(stream.current_message_snapshot.usage)
+        finally:
+            self._message_bufs.append(messages)
 
-        response = _call_claude()
-        if response:
-            return truncate_smart(response)
-        return None
+        return text
+
+    def cache_username(self, user_id: str, username: str) -> None:
+        """Remember a username, evicting the least recently used past the cap."""
+        self._user_cache[user_id] = username
+        self._user_cache.move_to_end(user_id)
+        if len(self._user_cache) > USER_CACHE_SIZE:
+            self._user_cache.popitem(last=False)
+
+    def cache_users(self, users: list[Any]) -> None:
+        """Remember usernames from expanded user objects."""
+        for user in users:
+            self.cache_username(str(user.id), user.username)
+
+    async def get_username_by_id(self, user_id: str) -> str:
+        """Get Twitter username by user ID, using the cache when possible."""
+        cached = self._user_cache.get(user_id)
+        if cached is not None:
+            self._user_cache.move_to_end(user_id)
+            return cached
 
-    def get_username_by_id(self, user_id: str) -> str:
-        """Get Twitter username by user ID."""
         if self.twitter_client is None:
             return user_id
 
-        @retry_on_error(
-            metrics=self.metrics,
-            circuit_breaker=self.circuit_breaker
-        )
-        def _get_user() -> Optional[str]:
-            user = self.twitter_client.get_user(id=user_id)
-            if user and user.data:
-                return user.data.username
-            return None
+        result = await self._get_user(user_id)
+        if not result:
+            return user_id
 
-        result = _get_user()
-        return result if result else user_id
+        self.cache_username(user_id, result)
+        return result
 
-    def post_reply(self, text: str, reply_to_id: str) -> bool:
+    async def _get_user_impl(self, user_id: str) -> Optional[str]:
+        """Look up a username (wrapped with retries in __init__)."""
+        user = await self.twitter_client.get_user(id=user_id)
+        if user and user.data:
+            return user.data.username
+        return None
+
+    async def post_reply(self, text: str, reply_to_id: str) -> bool:
         """
         Post a reply tweet.
 
@@ -419,21 +997,10 @@ class ClodBot:
 
         is_valid, error_msg = validate_tweet_text(text)
         if not is_valid:
-            logger.error(f"Invalid tweet text: {error_msg}")
+            logger.error("Invalid tweet text: %s", error_msg)
             return False
 
-        @retry_on_error(
-            metrics=self.metrics,
-            circuit_breaker=self.circuit_breaker
-        )
-        def _post() -> bool:
-            self.twitter_client.create_tweet(
-                text=text,
-                in_reply_to_tweet_id=reply_to_id
-            )
-            return True
-
-        result = _post()
+        result = await self._post(text, reply_to_id)
         if result:
             self.metrics.replies_sent += 1
             self.metrics.record_success()
@@ -442,83 +1009,190 @@ class ClodBot:
         self.metrics.record_failure()
         return False
 
-    def fetch_mentions(self) -> list[Any]:
+    async def _post_impl(self, text: str, reply_to_id: str) -> bool:
+        """Post a reply tweet (wrapped with retries in __init__)."""
+        await self.twitter_client.create_tweet(
+            text=text,
+            in_reply_to_tweet_id=reply_to_id
+        )
+        return True
+
+    async def fetch_mentions(self) -> list[Any]:
         """Fetch new mentions since last check."""
         if self.twitter_client is None or self.my_user_id is None:
             return []
 
-        @retry_on_error(
-            metrics=self.metrics,
-            circuit_breaker=self.circuit_breaker
+        result = await self._fetch()
+        return result if result else []
+
+    async def _fetch_impl(self) -> list[Any]:
+        """Fetch new mentions (wrapped with retries in __init__)."""
+        last_mention_id = self.state.get('last_mention_id')
+
+        mentions = await self.twitter_client.get_users_mentions(
+            id=self.my_user_id,
+            since_id=last_mention_id,
+            max_results=10,
+            expansions=["author_id"],
+            user_fields=["username"]
         )
-        def _fetch() -> list[Any]:
-            last_mention_id = self.state.get('last_mention_id')
 
-            mentions = self.twitter_client.get_users_mentions(
-                id=self.my_user_id,
-                since_id=last_mention_id,
-                max_results=10
-            )
+        # Usernames arrive with the mentions, saving a lookup per mention
+        if mentions and mentions.includes:
+            self.cache_users(mentions.includes.get("users", []))
 
-            return list(reversed(mentions.data)) if mentions and mentions.data else []
+        return list(reversed(mentions.data)) if mentions and mentions.data else []
 
-        result = _fetch()
-        return result if result else []
+    def skip_reason(self, mention: Any) -> Optional[str]:
+        """
+        Check whether a mention should be ignored without calling Claude.
+
+        Args:
+            mention: Twitter mention object
 
-    def process_mention(self, mention: Any) -> bool:
+        Returns:
+            Reason for skipping, or None if the mention needs a reply
         """
-        Process a single mention and reply.
+        if self.my_user_id is not None and str(mention.author_id) == self.my_user_id:
+            return "own tweet"
+
+        body = mention_body(mention.text)
+        if not body:
+            return "empty"
+        if all(_URL.fullmatch(token) for token in body.split()):
+            return "links only"
+        if _BLOCK is not None and _BLOCK.search(body):
+            return "blocked"
+        return None
+
+    async def generate_reply(self, mention: Any) -> Optional[str]:
+        """
+        Generate a reply to a mention without posting it.
+
+        Filtered mentions get no reply and bare greetings get a canned one.
+        At most MAX_CONCURRENT_GENERATIONS Claude calls run at once.
 
         Args:
             mention: Twitter mention object
 
         Returns:
-            True if reply was sent successfully
+            Reply text or None if the mention is skipped or no response
+            could be generated
         """
-        author_username = self.get_username_by_id(str(mention.author_id))
-        logger.info(f"New mention from @{author_username}: {mention.text}")
+        reason = self.skip_reason(mention)
+        if reason:
+            logger.info("Skipping mention %s: %s", mention.id, reason)
+            self.metrics.mentions_skipped += 1
+            return None
+
+        if GREETING_REPLIES and _GREETING.match(mention_body(mention.text)):
+            return random.choice(GREETING_REPLIES)
+
+        author_username = await self.get_username_by_id(str(mention.author_id))
+        logger.info("New mention from @%s: %s", author_username, mention.text)
 
-        response = self.get_claude_response(mention.text, author_username)
+        async with self._generation_slots:
+            response = await self.get_claude_response(mention.text, author_username)
 
         if not response:
-            logger.warning(f"Could not generate response for mention {mention.id}")
+            logger.warning("Could not generate response for mention %s", mention.id)
             self.metrics.record_failure()
-            return False
+            return None
+
+        return response
+
+    async def send_reply(self, mention: Any, response: str) -> bool:
+        """
+        Post a generated reply to a mention.
+
+        Args:
+            mention: Twitter mention object
+            response: Reply text
 
-        if self.post_reply(response, str(mention.id)):
-            logger.info(f"Replied: {response}")
+        Returns:
+            True if reply was sent successfully
+        """
+        if await self.post_reply(response, str(mention.id)):
+            logger.info("Replied: %s", response)
             self.metrics.mentions_processed += 1
             return True
 
         return False
 
-    def check_mentions(self) -> None:
+    async def process_mention(self, mention: Any) -> bool:
+        """
+        Process a single mention and reply.
+
+        Args:
+            mention: Twitter mention object
+
+        Returns:
+            True if reply was sent successfully
+        """
+        response = await self.generate_reply(mention)
+        if not response:
+            return False
+
+        return await self.send_reply(mention, response)
+
+    async def post_replies(
+        self,
+        mentions: list[Any],
+        replies: list[asyncio.Task[Optional[str]]]
+    ) -> None:
+        """
+        Post generated replies one at a time, in mention order.
+
+        Args:
+            mentions: Mentions in chronological order
+            replies: Reply generation tasks, one per mention
+        """
+        posted_any = False
+
+        for mention, reply in zip(mentions, replies):
+            if not self.running:
+                break
+
+            response = await reply
+            if response:
+                # Delay between replies to avoid rate limits
+                if posted_any and await self.wait_or_stop(REPLY_DELAY):
+                    break
+
+                await self.send_reply(mention, response)
+                posted_any = True
+
+            self.state['last_mention_id'] = str(mention.id)
+            self._state_dirty = True
+
+    async def check_mentions(self) -> None:
         """Check for new mentions and reply to each."""
         if not self.circuit_breaker.can_execute():
             logger.warning("Circuit breaker open, skipping mention check")
             return
 
-        mentions = self.fetch_mentions()
+        mentions = await self.fetch_mentions()
 
         if not mentions:
             logger.info("No new mentions")
             return
 
-        logger.info(f"Found {len(mentions)} new mention(s)")
-
-        for mention in mentions:
-            if not self.running:
-                break
-
-            self.process_mention(mention)
+        logger.info("Found %d new mention(s)", len(mentions))
 
-            # Update state after each mention
-            self.state['last_mention_id'] = str(mention.id)
-            self.save_state()
+        # Generate all replies concurrently, but post them serially so
+        # Twitter still sees one reply every REPLY_DELAY seconds
+        replies = [
+            asyncio.create_task(self.generate_reply(mention))
+            for mention in mentions
+        ]
+        try:
+            await self.post_replies(mentions, replies)
+        finally:
+            for reply in replies:
+                reply.cancel()
 
-            # Delay between replies to avoid rate limits
-            if self.running and mention != mentions[-1]:
-                time.sleep(REPLY_DELAY)
+        # One write per batch rather than per mention
+        self.flush_state()
 
     def get_health(self) -> dict[str, Any]:
         """
@@ -533,30 +1207,144 @@ class ClodBot:
             "running": self.running,
         }
 
-    def run(self) -> None:
-        """Main bot loop."""
-        logger.info("Clod bot starting...")
+    async def wait_or_stop(self, timeout: float) -> bool:
+        """
+        Sleep for up to timeout seconds, waking immediately on shutdown.
 
-        # Setup
-        self.check_api_keys()
-        self.initialize_clients()
-        self.authenticate()
-        self.state = self.load_state()
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the bot is shutting down
+        """
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return not self.running
+
+    def is_new_mention(self, mention: Any) -> bool:
+        """
+        Check whether a streamed mention still needs handling.
+
+        Recovery can queue older mentions behind newer streamed ones, so this
+        checks the IDs handled this session rather than a high-water mark;
+        only mentions at or below the ID persisted before streaming began
+        are known to be done.
+        """
+        if str(mention.id) in self._handled_ids:
+            return False
+        return self._resume_id is None or int(mention.id) > self._resume_id
+
+    def mark_handled(self, mention: Any) -> None:
+        """Remember a handled mention and advance last_mention_id."""
+        mention_id = str(mention.id)
+        self._handled_ids[mention_id] = None
+        if len(self._handled_ids) > HANDLED_MENTIONS_SIZE:
+            self._handled_ids.popitem(last=False)
+
+        last_mention_id = self.state.get('last_mention_id')
+        if last_mention_id is None or int(mention_id) > int(last_mention_id):
+            self.state['last_mention_id'] = mention_id
+        self._state_dirty = True
+
+    async def recover_mentions(self) -> None:
+        """Queue mentions missed since the last one handled."""
+        if self.mention_queue is None:
+            return
+
+        for mention in await self.fetch_mentions():
+            await self.mention_queue.put(mention)
+
+    async def start_stream(self, bearer_token: str) -> None:
+        """
+        Subscribe to a filtered stream of mentions.
+
+        Args:
+            bearer_token: App bearer token for the streaming API
+
+        Raises:
+            tweepy.TweepyException: If the stream rule cannot be set up
+        """
+        self.mention_queue = asyncio.Queue()
+        stream = MentionStream(
+            bearer_token,
+            self.mention_queue,
+            self.recover_mentions,
+            self.cache_users
+        )
+
+        rule = f"@{self.my_username}"
+        rules = await stream.get_rules()
+        if not any(r.value == rule for r in rules.data or []):
+            await stream.add_rules(tweepy.StreamRule(rule))
+
+        stream.filter(
+            tweet_fields=["author_id"],
+            expansions=["author_id"],
+            user_fields=["username"]
+        )
+        stream.task.add_done_callback(self._on_stream_done)
+        self.stream = stream
+
+    def _on_stream_done(self, task: asyncio.Task[Any]) -> None:
+        """Wake the consumer if the stream ends while the bot is still running."""
+        if not self.running:
+            return
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Mention stream failed: %s", task.exception())
+        else:
+            logger.error("Mention stream ended unexpectedly")
+
+        if self.mention_queue is not None:
+            self.mention_queue.put_nowait(None)
+
+    async def consume_mentions(self) -> None:
+        """Reply to streamed mentions until shutdown."""
+        if self.mention_queue is None:
+            return
+
+        last_mention_id = self.state.get('last_mention_id')
+        self._resume_id = int(last_mention_id) if last_mention_id is not None else None
+
+        while self.running:
+            mention = await self.mention_queue.get()
+            if mention is None:  # Shutdown sentinel
+                break
+
+            # Recovery and the stream may both deliver the same mention
+            if not self.is_new_mention(mention):
+                continue
+
+            sent = False
+            try:
+                sent = await self.process_mention(mention)
+            except Exception as e:
+                logger.error("Unexpected error processing mention: %s", e)
+                self.metrics.record_failure()
+
+            self.mark_handled(mention)
 
-        # Setup signal handlers
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+            # Write once a burst of mentions has drained
+            if self.mention_queue.empty():
+                self.flush_state()
 
-        logger.info(f"Checking mentions every {CHECK_MENTIONS_INTERVAL} seconds")
-        logger.info("Press Ctrl+C to stop")
+            # Delay between replies to avoid rate limits; mentions that
+            # were skipped or failed posted nothing, so need no pause
+            if sent and await self.wait_or_stop(REPLY_DELAY):
+                break
+
+    async def poll_mentions(self) -> None:
+        """Poll for mentions every CHECK_MENTIONS_INTERVAL seconds until shutdown."""
+        logger.info("Checking mentions every %d seconds", CHECK_MENTIONS_INTERVAL)
 
-        # Main loop
         while self.running:
             try:
-                self.check_mentions()
+                await self.check_mentions()
                 self.metrics.record_success()
             except Exception as e:
-                logger.error(f"Unexpected error in main loop: {e}")
+                logger.error("Unexpected error in main loop: %s", e)
                 self.metrics.record_failure()
 
                 # Back off if too many consecutive failures
@@ -566,25 +1354,79 @@ class ClodBot:
                         300  # Max 5 minutes
                     )
                     logger.warning(
-                        f"Multiple failures, backing off for {backoff_time}s"
+                        "Multiple failures, backing off for %ds", backoff_time
                     )
-                    time.sleep(backoff_time)
+                    if await self.wait_or_stop(backoff_time):
+                        break
 
-            # Sleep in small increments for faster shutdown response
-            for _ in range(CHECK_MENTIONS_INTERVAL):
-                if not self.running:
-                    break
-                time.sleep(1)
+            if await self.wait_or_stop(CHECK_MENTIONS_INTERVAL):
+                break
+
+    async def run(self) -> None:
+        """Main bot loop."""
+        logger.info("Clod bot starting...")
+
+        # Python 3.9 binds these to whichever loop existed when they were
+        # created, so rebuild them on the loop asyncio.run() started
+        self._stop = asyncio.Event()
+        self._generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+        # Setup
+        self.check_api_keys()
+        await self.initialize_clients()
+        # Release pooled connections however setup or the loop ends
+        try:
+            await self.authenticate()
+            self.state = self.load_state()
+
+            embed = load_embedder()
+            if embed is not None:
+                self.semantic_cache = SemanticCache(embed)
+                self.semantic_cache.load(SEMANTIC_CACHE_FILE)
+
+            # Setup signal handlers
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, self.signal_handler, signum, None)
+
+            bearer_token = self.keys.twitter_bearer_token if self.keys else None
+            if bearer_token:
+                try:
+                    await self.start_stream(bearer_token)
+                except tweepy.TweepyException as e:
+                    logger.warning("Could not start mention stream, polling instead: %s", e)
+                    self.mention_queue = None
+
+            logger.info("Press Ctrl+C to stop")
+
+            # Main loop
+            if self.stream is not None:
+                logger.info("Streaming mentions of @%s", self.my_username)
+                await self.consume_mentions()
+                self.stream.disconnect()
+                self.flush_state()
+
+                # Still running means the stream died; keep answering by polling
+                if self.running:
+                    logger.warning("Mention stream stopped, polling instead")
+                    self.mention_queue = None
+                    await self.poll_mentions()
+            else:
+                await self.poll_mentions()
+        finally:
+            await self.close_clients()
 
         # Log final metrics on shutdown
-        logger.info(f"Final metrics: {self.metrics.get_health_status()}")
+        # Only build the health dict if it will actually be logged
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Final metrics: %s", self.metrics.get_health_status())
         logger.info("Bot stopped")
 
 
 def main() -> None:
     """Entry point."""
     bot = ClodBot()
-    bot.run()
+    asyncio.run(bot.run())
 
 
 if __name__ == "__main__":
@@ -23,20 +23,52 @@ Guidelines:
 - You can use emojis sparingly
 """
 
+# Mention Filtering
+# Mentions matching any of these (case-insensitive) are ignored without calling Claude
+BLOCKED_PATTERNS: Final[tuple[str, ...]] = (
+    r"\bairdrop\b",
+    r"\bfree\s+crypto\b",
+    r"\bdm\s+(me\s+)?for\s+promo",
+    r"\bfollow\s+(for|4)\s+follow\b",
+)
+
+# Canned replies for bare greetings, sent without calling Claude
+GREETING_REPLIES: Final[tuple[str, ...]] = (
+    "gm to you too, now go drink some water 💧",
+    "hi. that's it? that's the whole tweet?",
+    "hey yourself 😏",
+    "yo. I was busy doing nothing, thanks for the interruption",
+)
+
 # Twitter Settings
 MAX_RESPONSE_LENGTH: Final[int] = 280  # Twitter character limit
 REPLY_DELAY: Final[int] = 10  # Seconds between replies to avoid spam
+TEXT_CACHE_SIZE: Final[int] = 512  # Memoized truncate/validate results for repeated tweet text
+
+# Claude Settings
+CLAUDE_MAX_TOKENS: Final[int] = 200  # 280 characters is ~80 tokens, with slack
+MAX_CONCURRENT_GENERATIONS: Final[int] = 4  # Claude replies generated in parallel per batch
 
 # Rate Limiting
 RATE_LIMIT_DELAY: Final[int] = 15  # Seconds to wait when rate limited by Twitter
 MAX_RETRIES: Final[int] = 3  # Number of retry attempts for failed API calls
-RETRY_DELAY: Final[int] = 5  # Seconds between retry attempts
+RETRY_DELAY: Final[int] = 5  # Base seconds between retry attempts (doubles each attempt)
+MAX_RETRY_DELAY: Final[int] = 60  # Cap on exponential retry delay
+MAX_RATE_LIMIT_WAIT: Final[int] = 300  # Cap on waits taken from Twitter's rate limit headers
+
+# HTTP Connection Pooling
+HTTP_MAX_CONNECTIONS: Final[int] = 40  # Pooled connections shared by Twitter API calls
+HTTP_KEEPALIVE_TIMEOUT: Final[int] = 30  # Seconds an idle connection is kept open for reuse
+
+# Username Cache
+USER_CACHE_SIZE: Final[int] = 1024  # Maximum author_id -> username entries kept in memory
 
 # Polling Settings
 CHECK_MENTIONS_INTERVAL: Final[int] = 60  # How often to check for new mentions (seconds)
 
 # State Persistence
 STATE_FILE: Final[str] = "state.json"  # File to persist bot state between restarts
+HANDLED_MENTIONS_SIZE: Final[int] = 1024  # Handled mention IDs remembered to skip duplicates
 
 # Circuit Breaker Settings
 CIRCUIT_BREAKER_THRESHOLD: Final[int] = 5  # Failures before circuit opens
@@ -45,3 +77,9 @@ CIRCUIT_BREAKER_TIMEOUT: Final[int] = 60  # Seconds before circuit attempts reco
 # Backoff Settings
 MAX_BACKOFF_TIME: Final[int] = 300  # Maximum backoff time in seconds (5 minutes)
 BACKOFF_MULTIPLIER: Final[int] = 10  # Multiply consecutive failures by this
+
+# Semantic Cache Settings
+SEMANTIC_CACHE_MODEL: Final[str] = "sentence-transformers/all-MiniLM-L6-v2"  # Local embedding model
+SEMANTIC_CACHE_THRESHOLD: Final[float] = 0.92  # Cosine similarity needed to reuse a reply
+SEMANTIC_CACHE_SIZE: Final[int] = 256  # Maximum cached replies before LRU eviction
+SEMANTIC_CACHE_FILE: Final[str] = "semantic_cache.npz"  # File to persist cached replies
@@ -3,49 +3,135 @@ Unit tests for Clod Twitter Bot
 Comprehensive test suite covering all functionality
 """
 
+import asyncio
+import io
 import json
 import os
+import shutil
+import sys
 import tempfile
 import time
 import unittest
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock, patch, PropertyMock
+from types import SimpleNamespace as NS
+from typing import Any, AsyncIterator, Iterator
+from unittest.mock import AsyncMock, MagicMock, patch, PropertyMock
 
 import anthropic
 import tweepy
 
+import bot as bot_module
 from bot import (
     BotMetrics,
     CircuitBreaker,
     ClodBot,
+    MentionStream,
+    SemanticCache,
+    load_embedder,
+    rate_limit_wait,
     retry_on_error,
     truncate_smart,
     validate_tweet_text,
 )
-from config import MAX_RESPONSE_LENGTH
+from config import GREETING_REPLIES, MAX_RATE_LIMIT_WAIT, MAX_RESPONSE_LENGTH
+
+# Filler payloads shared by the length tests
+_A_LIMIT = "a" * MAX_RESPONSE_LENGTH
+_A_300 = "a" * 300
+_A_500 = "a" * 500
+
+# Minimal aiohttp-style 429 response with no rate limit headers
+_RATE_LIMITED = NS(status=429, reason="Too Many Requests", headers={})
+
+# Newest-first get_users_mentions payload; fetch_mentions never mutates it
+_MENTIONS = [NS(id=i) for i in (1, 2, 3)]
+_MENTIONS_ENVELOPE = NS(data=_MENTIONS, includes={})
+
+# Claude failure shared by tests that only need some APIError to be raised
+_API_ERROR = anthropic.APIError(
+    message="API Error",
+    request=NS(method="POST", url="https://api.anthropic.com/v1/messages"),
+    body=None
+)
+
+
+class FakeMessageStream:
+    """Stand-in for the async context manager returned by messages.stream()."""
+
+    def __init__(self, chunks: list[str], usage: object = None) -> None:
+        self.chunks = chunks
+        self.consumed = 0
+        self.current_message_snapshot = MagicMock(usage=usage)
+
+    async def __aenter__(self) -> "FakeMessageStream":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        return None
+
+    @property
+    def text_stream(self) -> AsyncIterator[str]:
+        return self._stream_text()
+
+    async def _stream_text(self) -> AsyncIterator[str]:
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+
+@contextmanager
+def swap_env(env: dict[str, str]) -> Iterator[None]:
+    """Replace os.environ with env for the duration of the block."""
+    saved = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def reset_client(client: AsyncMock) -> AsyncMock:
+    """Clear calls, return values and side effects left by a previous test."""
+    client.reset_mock(return_value=True, side_effect=True)
+    return client
 
 
 class TestTruncateSmart(unittest.TestCase):
     """Tests for the truncate_smart function."""
 
-    def test_short_text_unchanged(self) -> None:
-        """Text under limit should not be modified."""
-        text = "Hello world!"
-        result = truncate_smart(text)
-        self.assertEqual(result, text)
-
-    def test_exact_limit_unchanged(self) -> None:
-        """Text exactly at limit should not be modified."""
-        text = "a" * MAX_RESPONSE_LENGTH
-        result = truncate_smart(text)
-        self.assertEqual(result, text)
+    # (text, expected) pairs that fit and come back only stripped
+    UNCHANGED_CASES = [
+        ("Hello world!", "Hello world!"),
+        (_A_LIMIT, _A_LIMIT),
+        ("", ""),
+        ("   ", ""),
+        ("  hello world  ", "hello world"),
+    ]
+
+    # (text, max_length) pairs that must be cut down with an ellipsis
+    TRUNCATED_CASES = [
+        (_A_300, MAX_RESPONSE_LENGTH),
+        ("Hello world this is a test", 15),
+    ]
+
+    def test_fitting_text_only_stripped(self) -> None:
+        """Text within the limit should only lose surrounding whitespace."""
+        truncate = truncate_smart
+        for text, expected in self.UNCHANGED_CASES:
+            with self.subTest(text=text[:20]):
+                self.assertEqual(truncate(text), expected)
 
     def test_long_text_truncated(self) -> None:
-        """Text over limit should be truncated with ellipsis."""
-        text = "a" * 300
-        result = truncate_smart(text)
-        self.assertTrue(len(result) <= MAX_RESPONSE_LENGTH)
-        self.assertTrue(result.endswith("..."))
+        """Text over the limit should be truncated with ellipsis."""
+        truncate = truncate_smart
+        for text, max_length in self.TRUNCATED_CASES:
+            with self.subTest(text=text[:20], max_length=max_length):
+                result = truncate(text, max_length)
+                self.assertTrue(len(result) <= max_length)
+                self.assertTrue(result.endswith("..."))
 
     def test_preserves_whole_words(self) -> None:
         """Truncation should not cut words in half."""
@@ -65,32 +151,14 @@ class TestTruncateSmart(unittest.TestCase):
         self.assertFalse(result.endswith("!..."))
         self.assertFalse(result.endswith(",,..."))
 
-    def test_custom_max_length(self) -> None:
-        """Should respect custom max_length parameter."""
-        text = "Hello world this is a test"
-        result = truncate_smart(text, max_length=15)
-        self.assertTrue(len(result) <= 15)
-        self.assertTrue(result.endswith("..."))
-
-    def test_empty_string(self) -> None:
-        """Empty string should return empty string."""
-        result = truncate_smart("")
-        self.assertEqual(result, "")
-
-    def test_none_like_empty(self) -> None:
-        """None-like values should be handled."""
-        result = truncate_smart("")
-        self.assertEqual(result, "")
-
-    def test_whitespace_only(self) -> None:
-        """Whitespace-only text should be stripped."""
-        result = truncate_smart("   ")
-        self.assertEqual(result, "")
-
-    def test_strips_leading_trailing_whitespace(self) -> None:
-        """Leading/trailing whitespace should be stripped."""
-        result = truncate_smart("  hello world  ")
-        self.assertEqual(result, "hello world")
+    def test_repeated_text_cached(self) -> None:
+        """Repeated text should be served from the cache."""
+        truncate_smart.cache_clear()
+        text = "Hello, world! " + "x" * 300
+        first = truncate_smart(text)
+        second = truncate_smart(text)
+        self.assertEqual(first, second)
+        self.assertEqual(truncate_smart.cache_info().hits, 1)
 
 
 class TestValidateTweetText(unittest.TestCase):
@@ -116,13 +184,13 @@ class TestValidateTweetText(unittest.TestCase):
 
     def test_too_long(self) -> None:
         """Text exceeding limit should fail validation."""
-        is_valid, error = validate_tweet_text("a" * 300)
+        is_valid, error = validate_tweet_text(_A_300)
         self.assertFalse(is_valid)
         self.assertIn("exceeds", error.lower())
 
     def test_exact_limit(self) -> None:
         """Text at exact limit should pass."""
-        is_valid, error = validate_tweet_text("a" * MAX_RESPONSE_LENGTH)
+        is_valid, error = validate_tweet_text(_A_LIMIT)
         self.assertTrue(is_valid)
 
 
@@ -173,12 +241,50 @@ class TestBotMetrics(unittest.TestCase):
         uptime = metrics.get_uptime_seconds()
         self.assertGreaterEqual(uptime, 0)
 
+    def test_last_activity_iso(self) -> None:
+        """Last activity should be reported as a recent ISO timestamp."""
+        metrics = BotMetrics()
+        self.assertIsNone(metrics.get_health_status()["last_activity"])
+
+        metrics.record_success()
+        last_activity = datetime.fromisoformat(metrics.get_health_status()["last_activity"])
+
+        self.assertLess(abs(datetime.now() - last_activity), timedelta(seconds=5))
+
     def test_health_status_healthy(self) -> None:
         """Health status should report healthy when few failures."""
         metrics = BotMetrics()
         status = metrics.get_health_status()
         self.assertTrue(status["healthy"])
 
+    def test_record_cache_usage(self) -> None:
+        """Prompt cache token usage should accumulate."""
+        metrics = BotMetrics()
+        metrics.record_cache_usage(MagicMock(
+            cache_read_input_tokens=100,
+            cache_creation_input_tokens=None
+        ))
+        metrics.record_cache_usage(MagicMock(
+            cache_read_input_tokens=50,
+            cache_creation_input_tokens=20
+        ))
+        self.assertEqual(metrics.cache_read_tokens, 150)
+        self.assertEqual(metrics.cache_creation_tokens, 20)
+
+    def test_health_status_reused(self) -> None:
+        """Health status should update the same dict in place."""
+        metrics = BotMetrics()
+        first = metrics.get_health_status()
+        metrics.replies_sent = 3
+        second = metrics.get_health_status()
+        self.assertIs(first, second)
+        self.assertEqual(second["replies_sent"], 3)
+
+    def test_no_instance_dict(self) -> None:
+        """Metrics should use slots rather than a per-instance dict."""
+        with self.assertRaises(AttributeError):
+            BotMetrics().unknown_metric = 1
+
     def test_health_status_unhealthy(self) -> None:
         """Health status should report unhealthy after many failures."""
         metrics = BotMetrics()
@@ -207,7 +313,7 @@ class TestCircuitBreaker(unittest.TestCase):
 
     def test_open_blocks_execution(self) -> None:
         """Open circuit should block execution."""
-        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=60, clock=lambda: 0.0)
         cb.record_failure()
         self.assertFalse(cb.can_execute())
 
@@ -222,14 +328,143 @@ class TestCircuitBreaker(unittest.TestCase):
 
     def test_half_open_after_timeout(self) -> None:
         """Circuit should go half-open after recovery timeout."""
-        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        now = [0.0]
+        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=60, clock=lambda: now[0])
         cb.record_failure()
         self.assertEqual(cb.state, "open")
+
+        now[0] += 59
+        self.assertFalse(cb.can_execute())
+
         # After timeout, should allow execution
+        now[0] += 1
         self.assertTrue(cb.can_execute())
         self.assertEqual(cb.state, "half-open")
 
 
+class TestSemanticCache(unittest.TestCase):
+    """Tests for the SemanticCache class."""
+
+    def setUp(self) -> None:
+        """Create a cache with a fake embedder."""
+        self.cache = SemanticCache(embed=lambda text: [1.0, 0.0], threshold=0.9)
+
+    def test_empty_cache_misses(self) -> None:
+        """Empty cache should return None."""
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "user"))
+
+    def test_similar_tweet_hits(self) -> None:
+        """Similar embedding should return the cached reply."""
+        self.cache.add([1.0, 0.0], "cached reply", "alice")
+        self.assertEqual(self.cache.lookup([0.99, 0.05], "bob"), "cached reply")
+
+    def test_dissimilar_tweet_misses(self) -> None:
+        """Dissimilar embedding should miss."""
+        self.cache.add([1.0, 0.0], "cached reply", "alice")
+        self.assertIsNone(self.cache.lookup([0.0, 1.0], "bob"))
+
+    def test_same_author_not_repeated(self) -> None:
+        """The same author should not receive a cached reply twice."""
+        self.cache.add([1.0, 0.0], "cached reply", "alice")
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "alice"))
+        self.assertEqual(self.cache.lookup([1.0, 0.0], "bob"), "cached reply")
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "bob"))
+
+    def test_lru_eviction(self) -> None:
+        """Least recently used entry should be evicted when full."""
+        cache = SemanticCache(embed=lambda text: [1.0, 0.0], threshold=0.9, max_size=2)
+        cache.add([1.0, 0.0], "first", "alice")
+        cache.add([0.0, 1.0], "second", "alice")
+        self.assertEqual(cache.lookup([1.0, 0.0], "bob"), "first")
+
+        cache.add([-1.0, 0.0], "third", "alice")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup([1.0, 0.0], "carol"), "first")
+        self.assertIsNone(cache.lookup([0.0, 1.0], "carol"))
+
+    def test_save_and_load(self) -> None:
+        """Cached replies should persist across save/load cycle."""
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, "cache.npz")
+        try:
+            self.cache.add([1.0, 0.0], "cached reply", "alice")
+            self.assertTrue(self.cache.save(path))
+
+            loaded = SemanticCache(embed=lambda text: [1.0, 0.0], threshold=0.9)
+            loaded.load(path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.assertEqual(loaded.lookup([1.0, 0.0], "alice"), "cached reply")
+
+    def test_load_corrupt_file_starts_empty(self) -> None:
+        """Empty or truncated cache files should be ignored, not raised."""
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, "cache.npz")
+        try:
+            self.cache.add([1.0, 0.0], "cached reply", "alice")
+            self.assertTrue(self.cache.save(path))
+            with open(path, 'rb') as f:
+                saved = f.read()
+
+            for label, contents in (("empty", b""), ("truncated", saved[:len(saved) // 2])):
+                with self.subTest(file=label):
+                    with open(path, 'wb') as f:
+                        f.write(contents)
+                    loaded = SemanticCache(embed=lambda text: [1.0, 0.0])
+                    loaded.load(path)
+                    self.assertEqual(len(loaded), 0)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_save_atomic_and_only_when_changed(self) -> None:
+        """Saving should go through a temp file and skip an unchanged cache."""
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, "cache.npz")
+        try:
+            self.cache.add([1.0, 0.0], "cached reply", "alice")
+            self.assertTrue(self.cache.save(path))
+            self.assertEqual(os.listdir(temp_dir), ["cache.npz"])
+
+            os.remove(path)
+            self.assertTrue(self.cache.save(path))
+            self.assertFalse(os.path.exists(path))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_load_embedder_survives_model_failure(self) -> None:
+        """A model that fails to load should disable the cache, not crash."""
+        fake_module = NS(SentenceTransformer=MagicMock(side_effect=OSError("offline")))
+        with patch.dict(sys.modules, {"sentence_transformers": fake_module}):
+            self.assertIsNone(load_embedder())
+
+    def test_load_ignores_other_model(self) -> None:
+        """A cache saved by a different embedding model should be discarded."""
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, "cache.npz")
+        try:
+            old = SemanticCache(embed=lambda text: [1.0, 0.0, 0.0], model="old-model")
+            old.add([1.0, 0.0, 0.0], "cached reply", "alice")
+            self.assertTrue(old.save(path))
+
+            self.cache.load(path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_width_change_misses_and_resets(self) -> None:
+        """Embeddings of a new width should miss, then replace the old entries."""
+        self.cache.add([1.0, 0.0, 0.0], "cached reply", "alice")
+
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "bob"))
+        self.cache.add([1.0, 0.0], "new reply", "bob")
+
+        self.assertEqual(self.cache.responses, ["new reply"])
+        self.assertEqual(self.cache.lookup([1.0, 0.0], "carol"), "new reply")
+
+
 class TestClodBotState(unittest.TestCase):
     """Tests for state persistence."""
 
@@ -237,18 +472,18 @@ class TestClodBotState(unittest.TestCase):
         """Create a temporary directory for state files."""
         self.temp_dir = tempfile.mkdtemp()
         self.state_file = os.path.join(self.temp_dir, "test_state.json")
+        self._orig_state_file = bot_module.STATE_FILE
+        bot_module.STATE_FILE = self.state_file
 
     def tearDown(self) -> None:
         """Clean up temporary files."""
-        if os.path.exists(self.state_file):
-            os.remove(self.state_file)
-        os.rmdir(self.temp_dir)
+        bot_module.STATE_FILE = self._orig_state_file
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_load_state_empty(self) -> None:
         """Loading non-existent state should return empty dict."""
         bot = ClodBot()
-        with patch('bot.STATE_FILE', self.state_file):
-            state = bot.load_state()
+        state = bot.load_state()
         self.assertEqual(state, {})
 
     def test_save_and_load_state(self) -> None:
@@ -256,51 +491,76 @@ class TestClodBotState(unittest.TestCase):
         bot = ClodBot()
         bot.state = {"last_mention_id": "12345"}
 
-        with patch('bot.STATE_FILE', self.state_file):
-            result = bot.save_state()
-            self.assertTrue(result)
+        result = bot.save_state()
+        self.assertTrue(result)
 
-            bot2 = ClodBot()
-            loaded = bot2.load_state()
+        bot2 = ClodBot()
+        loaded = bot2.load_state()
 
         self.assertEqual(loaded, {"last_mention_id": "12345"})
 
+    def test_save_state_atomic(self) -> None:
+        """Saving should replace the file and leave no temp file behind."""
+        bot = ClodBot()
+        bot.state = {"last_mention_id": "1"}
+
+        bot.save_state()
+        bot.state = {"last_mention_id": "2"}
+        bot.save_state()
+
+        self.assertEqual(os.listdir(self.temp_dir), ["test_state.json"])
+        with open(self.state_file, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"last_mention_id": "2"})
+
+    def test_flush_state_only_when_dirty(self) -> None:
+        """Flushing should write only after state changed."""
+        bot = ClodBot()
+        bot.state = {"last_mention_id": "1"}
+
+        self.assertTrue(bot.flush_state())
+        self.assertFalse(os.path.exists(self.state_file))
+
+        bot._state_dirty = True
+        self.assertTrue(bot.flush_state())
+
+        self.assertTrue(os.path.exists(self.state_file))
+        self.assertFalse(bot._state_dirty)
+
     def test_load_corrupted_state(self) -> None:
         """Corrupted state file should return empty dict."""
-        with open(self.state_file, 'w') as f:
-            f.write("not valid json {{{")
-
         bot = ClodBot()
-        with patch('bot.STATE_FILE', self.state_file):
+        raw = io.BytesIO(b"not valid json {{{")
+        with patch('bot.open', return_value=raw, create=True) as fake_open:
             state = bot.load_state()
         self.assertEqual(state, {})
+        self.assertEqual(fake_open.call_count, 1)
 
     def test_load_invalid_type_state(self) -> None:
         """State file with non-dict should return empty dict."""
-        with open(self.state_file, 'w') as f:
-            json.dump(["list", "not", "dict"], f)
-
         bot = ClodBot()
-        with patch('bot.STATE_FILE', self.state_file):
+        raw = io.BytesIO(json.dumps(["list", "not", "dict"]).encode())
+        with patch('bot.open', return_value=raw, create=True) as fake_open:
             state = bot.load_state()
         self.assertEqual(state, {})
+        self.assertEqual(fake_open.call_count, 1)
 
 
 class TestClodBotAPIKeys(unittest.TestCase):
     """Tests for API key validation."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build one bot; check_api_keys only replaces its key snapshot."""
+        cls.bot = ClodBot()
+
     def test_missing_keys_exits(self) -> None:
         """Missing API keys should cause sys.exit."""
-        bot = ClodBot()
-
-        with patch.dict(os.environ, {}, clear=True):
+        with swap_env({}):
             with self.assertRaises(SystemExit):
-                bot.check_api_keys()
+                self.bot.check_api_keys()
 
     def test_all_keys_present(self) -> None:
         """All keys present should not raise."""
-        bot = ClodBot()
-
         env = {
             'TWITTER_API_KEY': 'test',
             'TWITTER_API_SECRET': 'test',
@@ -309,190 +569,586 @@ class TestClodBotAPIKeys(unittest.TestCase):
             'ANTHROPIC_API_KEY': 'test'
         }
 
-        with patch.dict(os.environ, env, clear=True):
-            bot.check_api_keys()
+        with swap_env(env):
+            self.bot.check_api_keys()
+
+        self.assertEqual(self.bot.keys.anthropic_api_key, 'test')
+        self.assertIsNone(self.bot.keys.twitter_bearer_token)
 
     def test_partial_keys_exits(self) -> None:
         """Partial keys should cause sys.exit."""
-        bot = ClodBot()
-
         env = {
             'TWITTER_API_KEY': 'test',
             'TWITTER_API_SECRET': 'test',
         }
 
-        with patch.dict(os.environ, env, clear=True):
+        with swap_env(env):
             with self.assertRaises(SystemExit):
-                bot.check_api_keys()
+                self.bot.check_api_keys()
 
 
 class TestClodBotSignalHandler(unittest.TestCase):
     """Tests for graceful shutdown."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build one bot; each test restores the running flag it changes."""
+        cls.bot = ClodBot()
+
     def test_signal_handler_sets_running_false(self) -> None:
         """Signal handler should set running to False."""
+        self.bot.running = True
+        try:
+            self.bot.signal_handler(2, None)
+
+            self.assertFalse(self.bot.running)
+        finally:
+            self.bot.running = True
+            self.bot._stop.clear()
+
+
+class TestClodBotShutdownWait(unittest.IsolatedAsyncioTestCase):
+    """Tests for interruptible waits."""
+
+    async def test_wait_times_out_while_running(self) -> None:
+        """Wait should time out and report the bot still running."""
         bot = ClodBot()
-        self.assertTrue(bot.running)
+        self.assertFalse(await bot.wait_or_stop(0.01))
+
+    async def test_signal_wakes_wait(self) -> None:
+        """Shutdown signal should end a long wait immediately."""
+        bot = ClodBot()
+        wait = asyncio.create_task(bot.wait_or_stop(60))
+        await asyncio.sleep(0)
 
         bot.signal_handler(2, None)
 
-        self.assertFalse(bot.running)
+        self.assertTrue(await asyncio.wait_for(wait, timeout=1))
 
 
-class TestClodBotMentionProcessing(unittest.TestCase):
+class TestClodBotMentionProcessing(unittest.IsolatedAsyncioTestCase):
     """Tests for mention processing logic."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked clients once; setUp resets them per test."""
+        cls.twitter_client = AsyncMock()
+        cls.claude_client = AsyncMock()
+
     def setUp(self) -> None:
         """Create a bot with mocked clients."""
         self.bot = ClodBot()
-        self.bot.twitter_client = MagicMock()
-        self.bot.claude_client = MagicMock()
+        self.bot.twitter_client = reset_client(self.twitter_client)
+        self.bot.claude_client = reset_client(self.claude_client)
         self.bot.my_user_id = "123"
         self.bot.state = {}
 
-    def test_fetch_mentions_empty(self) -> None:
+    async def test_fetch_mentions_empty(self) -> None:
         """No mentions should return empty list."""
-        self.bot.twitter_client.get_users_mentions.return_value = MagicMock(data=None)
+        self.bot.twitter_client.get_users_mentions.return_value = NS(data=None, includes={})
 
-        result = self.bot.fetch_mentions()
+        result = await self.bot.fetch_mentions()
 
         self.assertEqual(result, [])
 
-    def test_fetch_mentions_returns_reversed(self) -> None:
+    async def test_fetch_mentions_returns_reversed(self) -> None:
         """Mentions should be returned in chronological order."""
-        mock_mentions = [MagicMock(id=1), MagicMock(id=2), MagicMock(id=3)]
-        self.bot.twitter_client.get_users_mentions.return_value = MagicMock(data=mock_mentions)
+        self.bot.twitter_client.get_users_mentions.return_value = _MENTIONS_ENVELOPE
 
-        result = self.bot.fetch_mentions()
+        result = await self.bot.fetch_mentions()
 
         self.assertEqual([m.id for m in result], [3, 2, 1])
 
-    def test_process_mention_success(self) -> None:
+    async def test_process_mention_success(self) -> None:
         """Successful mention processing should return True."""
-        mention = MagicMock(id="456", author_id="789", text="Hello @AI_clod")
+        mention = NS(id="456", author_id="789", text="Hello @AI_clod")
 
         self.bot.twitter_client.get_user.return_value = MagicMock(
-            data=MagicMock(username="testuser")
+            data=NS(username="testuser")
         )
 
-        self.bot.claude_client.messages.create.return_value = MagicMock(
-            content=[MagicMock(text="Hello there!")]
+        self.bot.claude_client.messages.stream = MagicMock(
+            return_value=FakeMessageStream(["Hello there!"])
         )
 
         self.bot.twitter_client.create_tweet.return_value = MagicMock()
 
-        result = self.bot.process_mention(mention)
+        result = await self.bot.process_mention(mention)
 
         self.assertTrue(result)
-        self.bot.twitter_client.create_tweet.assert_called_once()
+        self.assertEqual(self.bot.twitter_client.create_tweet.call_count, 1)
 
-    def test_process_mention_no_response(self) -> None:
+    async def test_process_mention_no_response(self) -> None:
         """Failed response generation should return False."""
-        mention = MagicMock(id="456", author_id="789", text="Hello @AI_clod")
+        mention = NS(id="456", author_id="789", text="Hello @AI_clod")
 
         self.bot.twitter_client.get_user.return_value = MagicMock(
-            data=MagicMock(username="testuser")
+            data=NS(username="testuser")
         )
 
-        self.bot.claude_client.messages.create.side_effect = anthropic.APIError(
-            message="API Error",
-            request=MagicMock(),
-            body=None
-        )
+        self.bot.claude_client.messages.stream = MagicMock(side_effect=_API_ERROR)
+        # A set stop event makes the bot's retry waits return at once
+        self.bot._stop.set()
 
-        result = self.bot.process_mention(mention)
+        result = await self.bot.process_mention(mention)
 
         self.assertFalse(result)
 
-    def test_fetch_mentions_no_client(self) -> None:
+    async def test_fetch_mentions_no_client(self) -> None:
         """No client should return empty list."""
         self.bot.twitter_client = None
-        result = self.bot.fetch_mentions()
+        result = await self.bot.fetch_mentions()
         self.assertEqual(result, [])
 
-    def test_fetch_mentions_no_user_id(self) -> None:
+    async def test_fetch_mentions_no_user_id(self) -> None:
         """No user ID should return empty list."""
         self.bot.my_user_id = None
-        result = self.bot.fetch_mentions()
+        result = await self.bot.fetch_mentions()
         self.assertEqual(result, [])
 
+    async def test_check_mentions_updates_last_mention_id(self) -> None:
+        """Checking mentions should save the newest processed mention ID."""
+        mentions = [NS(id=2), NS(id=1)]
+        self.bot.twitter_client.get_users_mentions.return_value = NS(data=mentions, includes={})
+        self.bot.generate_reply = AsyncMock(return_value="reply")
+        self.bot.send_reply = AsyncMock(return_value=True)
+        self.bot.save_state = MagicMock(return_value=True)
+
+        with patch('bot.REPLY_DELAY', 0):
+            await self.bot.check_mentions()
+
+        self.assertEqual(self.bot.send_reply.await_count, 2)
+        self.assertEqual(self.bot.state['last_mention_id'], "2")
+        self.assertEqual(self.bot.save_state.call_count, 1)
+
+    async def test_check_mentions_stops_when_not_running(self) -> None:
+        """Shutdown should stop processing without advancing state."""
+        mentions = [NS(id=1)]
+        self.bot.twitter_client.get_users_mentions.return_value = NS(data=mentions, includes={})
+        self.bot.generate_reply = AsyncMock(return_value="reply")
+        self.bot.send_reply = AsyncMock(return_value=True)
+        self.bot.save_state = MagicMock(return_value=True)
+        self.bot.running = False
+
+        await self.bot.check_mentions()
+
+        self.bot.send_reply.assert_not_awaited()
+        self.assertNotIn('last_mention_id', self.bot.state)
+
+    async def test_check_mentions_bounds_concurrent_generation(self) -> None:
+        """Replies should be generated concurrently up to the limit."""
+        active = 0
+        peak = 0
+
+        async def slow_response(text: str, author: str) -> str:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return f"reply to {text}"
+
+        mentions = [NS(id=i, author_id=i, text=str(i)) for i in range(5, 0, -1)]
+        self.bot.twitter_client.get_users_mentions.return_value = NS(data=mentions, includes={})
+        self.bot.get_username_by_id = AsyncMock(return_value="user")
+        self.bot.get_claude_response = slow_response
+        self.bot.send_reply = AsyncMock(return_value=True)
+        self.bot._generation_slots = asyncio.Semaphore(2)
+        self.bot.save_state = MagicMock(return_value=True)
+
+        with patch('bot.REPLY_DELAY', 0):
+            await self.bot.check_mentions()
+
+        self.assertEqual(peak, 2)
+        posted = [c.args[1] for c in self.bot.send_reply.await_args_list]
+        self.assertEqual(posted, [f"reply to {i}" for i in range(1, 6)])
+
+
+class TestClodBotMentionFilter(unittest.IsolatedAsyncioTestCase):
+    """Tests for skipping mentions without calling Claude."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked clients once; setUp resets them per test."""
+        cls.twitter_client = AsyncMock()
+        cls.claude_client = AsyncMock()
+
+    def setUp(self) -> None:
+        """Create a bot with mocked clients."""
+        self.bot = ClodBot()
+        self.bot.twitter_client = reset_client(self.twitter_client)
+        self.bot.claude_client = reset_client(self.claude_client)
+        self.bot.my_user_id = "123"
+
+    def test_own_tweet_skipped(self) -> None:
+        """The bot's own tweets should be skipped."""
+        mention = MagicMock(id=1, author_id=123, text="@AI_clod hello")
+        self.assertEqual(self.bot.skip_reason(mention), "own tweet")
+
+    def test_empty_mention_skipped(self) -> None:
+        """Mentions with nothing besides @handles should be skipped."""
+        mention = MagicMock(id=1, author_id=9, text="@AI_clod @someone ")
+        self.assertEqual(self.bot.skip_reason(mention), "empty")
+
+    def test_links_only_skipped(self) -> None:
+        """Mentions containing only links should be skipped."""
+        mention = MagicMock(id=1, author_id=9, text="@AI_clod https://t.co/abc http://x.y")
+        self.assertEqual(self.bot.skip_reason(mention), "links only")
+
+    def test_links_only_check_is_linear(self) -> None:
+        """Chained URL prefixes should not trigger catastrophic backtracking."""
+        mention = NS(id=1, author_id=9, text="@AI_clod " + "http://" * 38 + " x")
+        start = time.perf_counter()
+        self.assertIsNone(self.bot.skip_reason(mention))
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_blocked_skipped(self) -> None:
+        """Mentions matching the blocklist should be skipped."""
+        mention = MagicMock(id=1, author_id=9, text="@AI_clod huge AIRDROP live now")
+        self.assertEqual(self.bot.skip_reason(mention), "blocked")
+
+    def test_normal_mention_not_skipped(self) -> None:
+        """Regular mentions should get a reply."""
+        mention = MagicMock(id=1, author_id=9, text="@AI_clod roast my code https://t.co/x")
+        self.assertIsNone(self.bot.skip_reason(mention))
+
+    async def test_skipped_mention_not_sent_to_claude(self) -> None:
+        """Skipped mentions should not call Claude or count as failures."""
+        mention = MagicMock(id=1, author_id=9, text="@AI_clod https://t.co/abc")
+
+        result = await self.bot.generate_reply(mention)
+
+        self.assertIsNone(result)
+        self.assertEqual(self.bot.claude_client.messages.stream.call_count, 0)
+        self.assertEqual(self.bot.metrics.mentions_skipped, 1)
+        self.assertEqual(self.bot.metrics.errors_count, 0)
+
+    async def test_greeting_gets_canned_reply(self) -> None:
+        """Bare greetings should get a canned reply without calling Claude."""
+        mention = MagicMock(id=1, author_id=9, text="@AI_clod gm!")
+
+        result = await self.bot.generate_reply(mention)
+
+        self.assertIn(result, GREETING_REPLIES)
+        self.assertEqual(self.bot.claude_client.messages.stream.call_count, 0)
+        self.assertEqual(self.bot.twitter_client.get_user.call_count, 0)
+
+
+class TestClodBotStreaming(unittest.IsolatedAsyncioTestCase):
+    """Tests for streamed mention handling."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked client once; setUp resets it per test."""
+        cls.twitter_client = AsyncMock()
+
+    def setUp(self) -> None:
+        """Create a bot with a mention queue and mocked clients."""
+        self.bot = ClodBot()
+        self.bot.twitter_client = reset_client(self.twitter_client)
+        self.bot.my_user_id = "123"
+        self.bot.my_username = "AI_clod"
+        self.bot.mention_queue = asyncio.Queue()
+        self.bot.process_mention = AsyncMock(return_value=True)
+        self.bot.save_state = MagicMock(return_value=True)
+
+    async def test_stream_queues_tweets(self) -> None:
+        """Streamed tweets should be queued for processing."""
+        stream = MentionStream("token", self.bot.mention_queue, AsyncMock())
+        tweet = MagicMock(id=1)
+
+        await stream.on_tweet(tweet)
+
+        self.assertIs(self.bot.mention_queue.get_nowait(), tweet)
+
+    async def test_stream_recovers_on_connect(self) -> None:
+        """Connecting to the stream should trigger mention recovery."""
+        recover = AsyncMock()
+        stream = MentionStream("token", self.bot.mention_queue, recover)
+
+        await stream.on_connect()
+
+        self.assertEqual(recover.await_count, 1)
+
+    async def test_recover_mentions_queues_missed(self) -> None:
+        """Recovery should queue mentions fetched since the last one."""
+        mentions = [MagicMock(id=2), MagicMock(id=1)]
+        self.bot.twitter_client.get_users_mentions.return_value = MagicMock(data=mentions)
+
+        await self.bot.recover_mentions()
+
+        self.assertEqual(self.bot.mention_queue.qsize(), 2)
+        self.assertEqual(self.bot.mention_queue.get_nowait().id, 1)
 
-class TestClodBotClaudeResponse(unittest.TestCase):
+    async def test_consume_skips_old_and_stops_on_sentinel(self) -> None:
+        """Consumer should skip handled mentions and exit on shutdown."""
+        self.bot.state = {'last_mention_id': "5"}
+        for mention in (MagicMock(id=5), MagicMock(id=6)):
+            self.bot.mention_queue.put_nowait(mention)
+        self.bot.mention_queue.put_nowait(None)
+
+        with patch('bot.REPLY_DELAY', 0):
+            await self.bot.consume_mentions()
+
+        self.assertEqual(self.bot.process_mention.await_count, 1)
+        self.assertEqual(self.bot.state['last_mention_id'], "6")
+
+    async def test_consume_answers_recovered_behind_streamed(self) -> None:
+        """Older recovered mentions queued behind a newer one should still be answered."""
+        self.bot.state = {'last_mention_id': "90"}
+        for mention_id in (100, 95, 96, 100):  # streamed 100, then recovery 95..100
+            self.bot.mention_queue.put_nowait(NS(id=mention_id))
+        self.bot.mention_queue.put_nowait(None)
+
+        with patch('bot.REPLY_DELAY', 0):
+            await self.bot.consume_mentions()
+
+        answered = [c.args[0].id for c in self.bot.process_mention.await_args_list]
+        self.assertEqual(answered, [100, 95, 96])
+        self.assertEqual(self.bot.state['last_mention_id'], "100")
+
+    async def test_consume_waits_only_after_posting(self) -> None:
+        """Consumer should only pause after a reply was actually sent."""
+        self.bot.process_mention = AsyncMock(side_effect=[False, True])
+        self.bot.wait_or_stop = AsyncMock(return_value=False)
+        for mention in (MagicMock(id=1), MagicMock(id=2)):
+            self.bot.mention_queue.put_nowait(mention)
+        self.bot.mention_queue.put_nowait(None)
+
+        await self.bot.consume_mentions()
+
+        self.assertEqual(self.bot.wait_or_stop.await_count, 1)
+
+    async def test_signal_handler_wakes_consumer(self) -> None:
+        """Shutdown signal should unblock the stream consumer."""
+        self.bot.signal_handler(2, None)
+
+        self.assertIsNone(self.bot.mention_queue.get_nowait())
+
+    async def test_start_stream_adds_missing_rule(self) -> None:
+        """Starting the stream should add the mention rule once."""
+        with patch('bot.MentionStream') as stream_cls:
+            stream = stream_cls.return_value
+            stream.get_rules = AsyncMock(return_value=MagicMock(data=None))
+            stream.add_rules = AsyncMock()
+
+            await self.bot.start_stream("token")
+
+        rule = stream.add_rules.call_args.args[0]
+        self.assertEqual(rule.value, "@AI_clod")
+        self.assertEqual(stream.filter.call_count, 1)
+        self.assertIs(self.bot.stream, stream)
+        stream.task.add_done_callback.assert_called_once_with(self.bot._on_stream_done)
+
+    async def test_stream_failure_wakes_consumer(self) -> None:
+        """A stream task dying mid-run should log and unblock the consumer."""
+        async def fails() -> None:
+            raise tweepy.TweepyException("stream gone")
+
+        task = asyncio.ensure_future(fails())
+        await asyncio.wait([task])
+
+        with self.assertLogs('bot', level='ERROR') as logs:
+            self.bot._on_stream_done(task)
+
+        self.assertIn("stream gone", logs.output[0])
+        self.assertIsNone(self.bot.mention_queue.get_nowait())
+
+    async def test_stream_end_on_shutdown_is_quiet(self) -> None:
+        """The stream ending after shutdown should not queue another sentinel."""
+        task = asyncio.ensure_future(asyncio.sleep(0))
+        await task
+        self.bot.running = False
+
+        self.bot._on_stream_done(task)
+
+        self.assertTrue(self.bot.mention_queue.empty())
+
+
+class TestClodBotClaudeResponse(unittest.IsolatedAsyncioTestCase):
     """Tests for Claude response generation."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked client once; setUp resets it per test."""
+        cls.claude_client = AsyncMock()
+
     def setUp(self) -> None:
         """Create a bot with mocked Claude client."""
         self.bot = ClodBot()
-        self.bot.claude_client = MagicMock()
+        self.bot.claude_client = reset_client(self.claude_client)
 
-    def test_empty_tweet_text(self) -> None:
+    async def test_empty_tweet_text(self) -> None:
         """Empty tweet text should return None."""
-        result = self.bot.get_claude_response("", "user")
+        result = await self.bot.get_claude_response("", "user")
         self.assertIsNone(result)
 
-    def test_whitespace_tweet_text(self) -> None:
+    async def test_whitespace_tweet_text(self) -> None:
         """Whitespace-only tweet text should return None."""
-        result = self.bot.get_claude_response("   ", "user")
+        result = await self.bot.get_claude_response("   ", "user")
         self.assertIsNone(result)
 
-    def test_no_client(self) -> None:
+    async def test_no_client(self) -> None:
         """No Claude client should return None."""
         self.bot.claude_client = None
-        result = self.bot.get_claude_response("Hello", "user")
+        result = await self.bot.get_claude_response("Hello", "user")
         self.assertIsNone(result)
 
-    def test_successful_response(self) -> None:
+    async def test_successful_response(self) -> None:
         """Successful response should be returned and truncated."""
-        self.bot.claude_client.messages.create.return_value = MagicMock(
-            content=[MagicMock(text="This is a response")]
+        self.bot.claude_client.messages.stream = MagicMock(
+            return_value=FakeMessageStream(["This is a response"])
         )
 
-        result = self.bot.get_claude_response("Hello", "testuser")
+        result = await self.bot.get_claude_response("Hello", "testuser")
 
         self.assertEqual(result, "This is a response")
 
-    def test_long_response_truncated(self) -> None:
+    async def test_system_prompt_cacheable(self) -> None:
+        """System prompt should be sent with cache control."""
+        self.bot.claude_client.messages.stream = MagicMock(return_value=FakeMessageStream(
+            ["This is a response"],
+            usage=NS(cache_read_input_tokens=42, cache_creation_input_tokens=0)
+        ))
+
+        await self.bot.get_claude_response("Hello", "testuser")
+
+        kwargs = self.bot.claude_client.messages.stream.call_args.kwargs
+        self.assertEqual(kwargs["system"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(self.bot.metrics.cache_read_tokens, 42)
+
+    async def test_message_buffer_reused(self) -> None:
+        """Sequential calls should reuse one message payload."""
+        self.bot.claude_client.messages.stream = MagicMock(
+            side_effect=lambda **kwargs: FakeMessageStream(["ok"])
+        )
+
+        await self.bot.get_claude_response("first", "alice")
+        await self.bot.get_claude_response("second", "bob")
+
+        first, second = (
+            call.kwargs["messages"]
+            for call in self.bot.claude_client.messages.stream.call_args_list
+        )
+        self.assertIs(first, second)
+        self.assertEqual(second[0]["content"], "Tweet from @bob: second")
+        self.assertEqual(len(self.bot._message_bufs), 1)
+
+    async def test_semantic_cache_hit_skips_claude(self) -> None:
+        """Semantic cache hit should not call Claude."""
+        self.bot.semantic_cache = SemanticCache(embed=lambda text: [1.0, 0.0])
+        self.bot.semantic_cache.add([1.0, 0.0], "cached reply", "someone")
+
+        result = await self.bot.get_claude_response("Hello", "testuser")
+
+        self.assertEqual(result, "cached reply")
+        self.assertEqual(self.bot.claude_client.messages.stream.call_count, 0)
+        self.assertEqual(self.bot.metrics.semantic_cache_hits, 1)
+
+    async def test_semantic_cache_failure_falls_back_to_claude(self) -> None:
+        """A failing semantic cache lookup or add should not prevent a Claude reply."""
+        failures = [
+            {"lookup": MagicMock(side_effect=ValueError("bad shape"))},
+            {"add": MagicMock(side_effect=ValueError("bad shape"))},
+        ]
+        for methods in failures:
+            with self.subTest(failing=next(iter(methods))):
+                self.bot.semantic_cache = SemanticCache(embed=lambda text: [1.0, 0.0])
+                for name, method in methods.items():
+                    setattr(self.bot.semantic_cache, name, method)
+                self.bot.claude_client.messages.stream = MagicMock(
+                    return_value=FakeMessageStream(["This is a response"])
+                )
+
+                result = await self.bot.get_claude_response("Hello", "testuser")
+
+                self.assertEqual(result, "This is a response")
+
+    async def test_semantic_cache_stores_response(self) -> None:
+        """Claude responses should be added to the semantic cache."""
+        self.bot.semantic_cache = SemanticCache(embed=lambda text: [1.0, 0.0])
+        self.bot.claude_client.messages.stream = MagicMock(
+            return_value=FakeMessageStream(["This is a response"])
+        )
+
+        await self.bot.get_claude_response("Hello", "testuser")
+
+        self.assertEqual(self.bot.semantic_cache.responses, ["This is a response"])
+
+    async def test_semantic_cache_readdresses_author(self) -> None:
+        """A reused reply should name the new author, not the one it was written for."""
+        self.bot.semantic_cache = SemanticCache(embed=lambda text: [1.0, 0.0])
+        self.bot.claude_client.messages.stream = MagicMock(
+            return_value=FakeMessageStream(["Nice try @Alice, and hi @alicent"])
+        )
+
+        await self.bot.get_claude_response("roast me", "alice")
+        result = await self.bot.get_claude_response("roast me", "bob")
+
+        self.assertEqual(
+            self.bot.semantic_cache.responses, ["Nice try @{author}, and hi @alicent"]
+        )
+        self.assertEqual(result, "Nice try @bob, and hi @alicent")
+        self.assertEqual(self.bot.claude_client.messages.stream.call_count, 1)
+
+    async def test_stream_stops_once_too_long(self) -> None:
+        """Streaming should stop reading once the reply overflows a tweet."""
+        stream = FakeMessageStream(["word " * 20] * 10)
+        self.bot.claude_client.messages.stream = MagicMock(return_value=stream)
+
+        result = await self.bot.get_claude_response("Hello", "testuser")
+
+        self.assertEqual(stream.consumed, 3)
+        self.assertTrue(len(result) <= MAX_RESPONSE_LENGTH)
+        self.assertTrue(result.endswith("..."))
+
+    async def test_long_response_truncated(self) -> None:
         """Long response should be truncated."""
-        long_text = "a" * 500
-        self.bot.claude_client.messages.create.return_value = MagicMock(
-            content=[MagicMock(text=long_text)]
+        long_text = _A_500
+        self.bot.claude_client.messages.stream = MagicMock(
+            return_value=FakeMessageStream([long_text])
         )
 
-        result = self.bot.get_claude_response("Hello", "testuser")
+        result = await self.bot.get_claude_response("Hello", "testuser")
 
         self.assertIsNotNone(result)
         self.assertTrue(len(result) <= MAX_RESPONSE_LENGTH)
 
 
-class TestClodBotPostReply(unittest.TestCase):
+class TestClodBotPostReply(unittest.IsolatedAsyncioTestCase):
     """Tests for posting replies."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked client once; setUp resets it per test."""
+        cls.twitter_client = AsyncMock()
+
     def setUp(self) -> None:
         """Create a bot with mocked Twitter client."""
         self.bot = ClodBot()
-        self.bot.twitter_client = MagicMock()
+        self.bot.twitter_client = reset_client(self.twitter_client)
 
-    def test_no_client(self) -> None:
+    async def test_no_client(self) -> None:
         """No client should return False."""
         self.bot.twitter_client = None
-        result = self.bot.post_reply("Hello", "123")
+        result = await self.bot.post_reply("Hello", "123")
         self.assertFalse(result)
 
-    def test_empty_text(self) -> None:
+    async def test_empty_text(self) -> None:
         """Empty text should return False."""
-        result = self.bot.post_reply("", "123")
+        result = await self.bot.post_reply("", "123")
         self.assertFalse(result)
 
-    def test_too_long_text(self) -> None:
+    async def test_too_long_text(self) -> None:
         """Too long text should return False."""
-        result = self.bot.post_reply("a" * 300, "123")
+        result = await self.bot.post_reply(_A_300, "123")
         self.assertFalse(result)
 
-    def test_successful_post(self) -> None:
+    async def test_successful_post(self) -> None:
         """Successful post should return True and update metrics."""
         self.bot.twitter_client.create_tweet.return_value = MagicMock()
 
-        result = self.bot.post_reply("Hello!", "123")
+        result = await self.bot.post_reply("Hello!", "123")
 
         self.assertTrue(result)
         self.assertEqual(self.bot.metrics.replies_sent, 1)
@@ -501,10 +1157,14 @@ class TestClodBotPostReply(unittest.TestCase):
 class TestClodBotHealth(unittest.TestCase):
     """Tests for health check functionality."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build one bot; the tests only read its health."""
+        cls.bot = ClodBot()
+
     def test_get_health(self) -> None:
         """Health check should return complete status."""
-        bot = ClodBot()
-        health = bot.get_health()
+        health = self.bot.get_health()
 
         self.assertIn("healthy", health)
         self.assertIn("running", health)
@@ -515,167 +1175,350 @@ class TestClodBotHealth(unittest.TestCase):
 
     def test_health_reflects_running_state(self) -> None:
         """Health should reflect running state."""
-        bot = ClodBot()
-        self.assertTrue(bot.get_health()["running"])
+        self.bot.running = True
+        try:
+            self.assertTrue(self.bot.get_health()["running"])
 
-        bot.running = False
-        self.assertFalse(bot.get_health()["running"])
+            self.bot.running = False
+            self.assertFalse(self.bot.get_health()["running"])
+        finally:
+            self.bot.running = True
 
 
-class TestRetryDecorator(unittest.TestCase):
+async def no_sleep(*_: Any) -> None:
+    """Stand-in for asyncio.sleep that returns immediately."""
+
+
+class TestRetryDecorator(unittest.IsolatedAsyncioTestCase):
     """Tests for the retry decorator."""
 
-    def test_successful_call_no_retry(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Make every retry and rate limit wait return immediately."""
+        cls._real_sleep = bot_module._sleep
+        bot_module._sleep = no_sleep
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Restore the real sleep."""
+        bot_module._sleep = cls._real_sleep
+
+    async def test_successful_call_no_retry(self) -> None:
         """Successful call should not retry."""
         call_count = 0
 
         @retry_on_error(max_retries=3, delay=0)
-        def successful_func() -> str:
+        async def successful_func() -> str:
             nonlocal call_count
             call_count += 1
             return "success"
 
-        result = successful_func()
+        result = await successful_func()
 
         self.assertEqual(result, "success")
         self.assertEqual(call_count, 1)
 
-    def test_retry_on_tweepy_error(self) -> None:
+    async def test_retry_on_tweepy_error(self) -> None:
         """Should retry on TweepyException."""
         call_count = 0
 
         @retry_on_error(max_retries=3, delay=0)
-        def failing_func() -> str:
+        async def failing_func() -> str:
             nonlocal call_count
             call_count += 1
             if call_count < 3:
                 raise tweepy.TweepyException("Error")
             return "success"
 
-        result = failing_func()
+        result = await failing_func()
 
         self.assertEqual(result, "success")
         self.assertEqual(call_count, 3)
 
-    def test_returns_none_after_max_retries(self) -> None:
+    async def test_returns_none_after_max_retries(self) -> None:
         """Should return None after all retries exhausted."""
         @retry_on_error(max_retries=2, delay=0)
-        def always_fails() -> str:
+        async def always_fails() -> str:
             raise tweepy.TweepyException("Error")
 
-        result = always_fails()
+        result = await always_fails()
 
         self.assertIsNone(result)
 
-    def test_metrics_tracked_on_retry(self) -> None:
+    async def test_metrics_tracked_on_retry(self) -> None:
         """Metrics should be updated on retry."""
         metrics = BotMetrics()
 
         @retry_on_error(max_retries=2, delay=0, metrics=metrics)
-        def failing_func() -> str:
+        async def failing_func() -> str:
             raise tweepy.TweepyException("Error")
 
-        failing_func()
+        await failing_func()
 
         self.assertGreater(metrics.retries_count, 0)
 
-    def test_circuit_breaker_blocks(self) -> None:
+    async def test_circuit_breaker_blocks(self) -> None:
         """Circuit breaker should block execution when open."""
         cb = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
         cb.record_failure()
 
         @retry_on_error(max_retries=3, delay=0, circuit_breaker=cb)
-        def func() -> str:
+        async def func() -> str:
             return "success"
 
-        result = func()
+        result = await func()
 
         self.assertIsNone(result)
 
-    def test_rate_limit_handling(self) -> None:
+    async def test_rate_limit_handling(self) -> None:
         """Should handle rate limit errors specially."""
         metrics = BotMetrics()
         call_count = 0
 
         @retry_on_error(max_retries=3, delay=0, metrics=metrics)
-        def rate_limited_func() -> str:
+        async def rate_limited_func() -> str:
             nonlocal call_count
             call_count += 1
             if call_count == 1:
-                raise tweepy.TooManyRequests(MagicMock())
+                raise tweepy.TooManyRequests(_RATE_LIMITED, response_json={})
             return "success"
 
-        with patch('bot.RATE_LIMIT_DELAY', 0):
-            result = rate_limited_func()
+        bot_module.RATE_LIMIT_DELAY, orig_delay = 0, bot_module.RATE_LIMIT_DELAY
+        try:
+            result = await rate_limited_func()
+        finally:
+            bot_module.RATE_LIMIT_DELAY = orig_delay
 
         self.assertEqual(result, "success")
         self.assertEqual(metrics.rate_limits_hit, 1)
 
+    async def test_no_wait_after_last_rate_limit(self) -> None:
+        """Giving up on a rate limit should not wait out the reset window."""
+        sleep = AsyncMock()
+
+        @retry_on_error(max_retries=2, delay=0)
+        async def always_limited() -> str:
+            raise tweepy.TooManyRequests(_RATE_LIMITED, response_json={})
+
+        with patch('bot._sleep', sleep):
+            result = await always_limited()
+
+        self.assertIsNone(result)
+        self.assertEqual(sleep.await_count, 1)
+
+    async def test_exponential_backoff(self) -> None:
+        """Retry delays should grow exponentially."""
+        sleep = AsyncMock()
+
+        @retry_on_error(max_retries=3, delay=2)
+        async def always_fails() -> str:
+            raise tweepy.TweepyException("Error")
+
+        with patch('bot._sleep', sleep), patch('bot._random', return_value=0.5):
+            await always_fails()
+
+        waits = [c.args[0] for c in sleep.await_args_list]
+        self.assertEqual(waits, [3.0, 5.0])
+
+    def test_rate_limit_wait_uses_retry_after(self) -> None:
+        """Retry-After header should set the wait time."""
+        error = MagicMock(response=MagicMock(headers={"retry-after": "7"}))
+        with patch('bot._random', return_value=0.0):
+            self.assertEqual(rate_limit_wait(error), 7.0)
+
+    def test_rate_limit_wait_uses_reset(self) -> None:
+        """x-rate-limit-reset header should set the wait time."""
+        reset = str(int(time.time()) + 30)
+        error = MagicMock(response=MagicMock(headers={"x-rate-limit-reset": reset}))
+        wait = rate_limit_wait(error)
+        self.assertGreater(wait, 25)
+        self.assertLessEqual(wait, 32)
+
+    def test_rate_limit_wait_capped(self) -> None:
+        """A far-off Retry-After should be capped at MAX_RATE_LIMIT_WAIT."""
+        error = NS(response=NS(headers={"retry-after": "3600"}))
+        with patch('bot._random', return_value=0.0):
+            self.assertEqual(rate_limit_wait(error), MAX_RATE_LIMIT_WAIT)
+
+    async def test_stop_abandons_retry(self) -> None:
+        """A sleep reporting shutdown should end retries without another call."""
+        call_count = 0
+        stop = AsyncMock(return_value=True)
+
+        @retry_on_error(max_retries=3, delay=0, sleep=stop)
+        async def rate_limited() -> str:
+            nonlocal call_count
+            call_count += 1
+            raise tweepy.TooManyRequests(_RATE_LIMITED, response_json={})
+
+        self.assertIsNone(await rate_limited())
+        self.assertEqual(call_count, 1)
+        self.assertEqual(stop.await_count, 1)
+
+    async def test_retries_count_only_real_retries(self) -> None:
+        """The final failed attempt should not be counted as a retry."""
+        metrics = BotMetrics()
+
+        @retry_on_error(max_retries=3, delay=0, metrics=metrics)
+        async def always_fails() -> str:
+            raise tweepy.TweepyException("Error")
+
+        await always_fails()
+
+        self.assertEqual(metrics.retries_count, 2)
+
+    def test_rate_limit_wait_fallback(self) -> None:
+        """Missing headers should fall back to RATE_LIMIT_DELAY."""
+        error = MagicMock(response=MagicMock(headers={}))
+        bot_module.RATE_LIMIT_DELAY, orig_delay = 15, bot_module.RATE_LIMIT_DELAY
+        try:
+            self.assertEqual(rate_limit_wait(error), 15)
+        finally:
+            bot_module.RATE_LIMIT_DELAY = orig_delay
+
+
+class TestClodBotClients(unittest.IsolatedAsyncioTestCase):
+    """Tests for API client setup and teardown."""
+
+    async def test_twitter_session_reused_and_closed(self) -> None:
+        """Twitter client should share one session until closed."""
+        bot = ClodBot()
+        with patch.dict(os.environ, {'ANTHROPIC_API_KEY': 'test'}):
+            await bot.initialize_clients()
+
+        session = bot.twitter_client.session
+        self.assertIsNotNone(session)
+        self.assertFalse(session.closed)
+
+        await bot.close_clients()
+
+        self.assertTrue(session.closed)
+        self.assertIsNone(bot.twitter_client.session)
 
-class TestClodBotAuthentication(unittest.TestCase):
+    async def test_run_closes_clients_when_setup_fails(self) -> None:
+        """Clients should be closed even if startup exits early."""
+        bot = ClodBot()
+        bot.check_api_keys = MagicMock()
+        bot.initialize_clients = AsyncMock()
+        bot.authenticate = AsyncMock(side_effect=SystemExit(1))
+        bot.close_clients = AsyncMock()
+
+        with self.assertRaises(SystemExit):
+            await bot.run()
+
+        self.assertEqual(bot.close_clients.await_count, 1)
+
+
+class TestClodBotAuthentication(unittest.IsolatedAsyncioTestCase):
     """Tests for Twitter authentication."""
 
-    def test_authenticate_success(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked client once; setUp resets it per test."""
+        cls.twitter_client = AsyncMock()
+
+    def setUp(self) -> None:
+        """Create a bot with mocked Twitter client."""
+        self.bot = ClodBot()
+        self.bot.twitter_client = reset_client(self.twitter_client)
+
+    async def test_authenticate_success(self) -> None:
         """Successful auth should set user ID."""
-        bot = ClodBot()
-        bot.twitter_client = MagicMock()
-        bot.twitter_client.get_me.return_value = MagicMock(
-            data=MagicMock(id=12345, username="testbot")
+        self.bot.twitter_client.get_me.return_value = MagicMock(
+            data=NS(id=12345, username="testbot")
         )
 
-        bot.authenticate()
+        await self.bot.authenticate()
 
-        self.assertEqual(bot.my_user_id, "12345")
+        self.assertEqual(self.bot.my_user_id, "12345")
 
-    def test_authenticate_no_client(self) -> None:
+    async def test_authenticate_no_client(self) -> None:
         """No client should exit."""
-        bot = ClodBot()
-        bot.twitter_client = None
+        self.bot.twitter_client = None
 
         with self.assertRaises(SystemExit):
-            bot.authenticate()
+            await self.bot.authenticate()
 
-    def test_authenticate_no_data(self) -> None:
+    async def test_authenticate_no_data(self) -> None:
         """No user data should exit."""
-        bot = ClodBot()
-        bot.twitter_client = MagicMock()
-        bot.twitter_client.get_me.return_value = MagicMock(data=None)
+        self.bot.twitter_client.get_me.return_value = NS(data=None)
 
         with self.assertRaises(SystemExit):
-            bot.authenticate()
+            await self.bot.authenticate()
 
 
-class TestClodBotGetUsername(unittest.TestCase):
+class TestClodBotGetUsername(unittest.IsolatedAsyncioTestCase):
     """Tests for username lookup."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Build the mocked client once; setUp resets it per test."""
+        cls.twitter_client = AsyncMock()
+
     def setUp(self) -> None:
         """Create a bot with mocked Twitter client."""
         self.bot = ClodBot()
-        self.bot.twitter_client = MagicMock()
+        self.bot.twitter_client = reset_client(self.twitter_client)
 
-    def test_successful_lookup(self) -> None:
+    async def test_successful_lookup(self) -> None:
         """Successful lookup should return username."""
         self.bot.twitter_client.get_user.return_value = MagicMock(
-            data=MagicMock(username="founduser")
+            data=NS(username="founduser")
         )
 
-        result = self.bot.get_username_by_id("123")
+        result = await self.bot.get_username_by_id("123")
 
         self.assertEqual(result, "founduser")
 
-    def test_no_client_returns_id(self) -> None:
+    async def test_no_client_returns_id(self) -> None:
         """No client should return the ID."""
         self.bot.twitter_client = None
 
-        result = self.bot.get_username_by_id("123")
+        result = await self.bot.get_username_by_id("123")
 
         self.assertEqual(result, "123")
 
-    def test_lookup_fails_returns_id(self) -> None:
+    async def test_lookup_cached(self) -> None:
+        """Repeated lookups should only hit the API once."""
+        self.bot.twitter_client.get_user.return_value = MagicMock(
+            data=NS(username="founduser")
+        )
+
+        await self.bot.get_username_by_id("123")
+        result = await self.bot.get_username_by_id("123")
+
+        self.assertEqual(result, "founduser")
+        self.assertEqual(self.bot.twitter_client.get_user.call_count, 1)
+
+    async def test_cache_populated_from_mentions(self) -> None:
+        """Usernames included with mentions should skip the lookup."""
+        self.bot.my_user_id = "1"
+        self.bot.twitter_client.get_users_mentions.return_value = MagicMock(
+            data=[NS(id=10, author_id=123)],
+            includes={"users": [NS(id=123, username="mentioner")]}
+        )
+
+        await self.bot.fetch_mentions()
+        result = await self.bot.get_username_by_id("123")
+
+        self.assertEqual(result, "mentioner")
+        self.assertEqual(self.bot.twitter_client.get_user.call_count, 0)
+
+    async def test_cache_evicts_oldest(self) -> None:
+        """Cache should stay bounded by evicting least recently used."""
+        with patch('bot.USER_CACHE_SIZE', 2):
+            self.bot.cache_username("1", "one")
+            self.bot.cache_username("2", "two")
+            await self.bot.get_username_by_id("1")
+            self.bot.cache_username("3", "three")
+
+        self.assertEqual(list(self.bot._user_cache), ["1", "3"])
+
+    async def test_lookup_fails_returns_id(self) -> None:
         """Failed lookup should return the ID."""
-        self.bot.twitter_client.get_user.return_value = MagicMock(data=None)
+        self.bot.twitter_client.get_user.return_value = NS(data=None)
 
-        result = self.bot.get_username_by_id("123")
+        result = await self.bot.get_username_by_id("123")
 
         self.assertEqual(result, "123")
 